@@ -0,0 +1,248 @@
+# admission.py
+# ------------------------------------------------------------
+# Admission-Control für /predict:
+# - Begrenzt gleichzeitige Inferenzen (in-flight) und die Warteschlange.
+# - Schätzt die Wartezeit aus der gleitenden mittleren Bearbeitungszeit
+#   (EWMA) und lehnt sofort mit 503 + Retry-After ab, wenn die geschätzte
+#   Wartezeit die Request-Deadline überschreitet.
+# - Token-Bucket pro Client (IP) -> 429 + Retry-After bei Überschreitung.
+# - Deadline-Objekt, das bis in Inferenz und OFF-Abfragen durchgereicht wird,
+#   damit abgebrochene/abgelaufene Requests keine CPU mehr verbrauchen.
+#
+# Design:
+# - Nur Standardbibliothek (asyncio, time), kein Redis o. Ä. nötig:
+#   Das Backend läuft als einzelner uvicorn-Prozess auf EC2.
+# - Konfiguration über Umgebungsvariablen mit sinnvollen Defaults.
+# ------------------------------------------------------------
+
+import asyncio                             # Warten auf freie Inferenz-Slots
+import math                                # ceil() für Retry-After (ganze Sekunden)
+import os                                  # Konfiguration aus Umgebungsvariablen
+import time                                # monotone Uhr für Deadlines/Token-Bucket
+from contextlib import asynccontextmanager
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, default))
+    except ValueError:
+        return default
+
+
+# ---- Konfiguration (per Env überschreibbar) ----------------
+MAX_INFLIGHT      = max(1, int(_env_float("PREDICT_MAX_INFLIGHT", 1)))   # parallele Inferenzen (CPU-gebunden -> klein halten)
+MAX_QUEUE         = max(0, int(_env_float("PREDICT_MAX_QUEUE", 8)))      # wartende Requests hinter den Slots
+DEADLINE_S        = _env_float("PREDICT_DEADLINE_S", 15.0)               # Zeitbudget pro /predict (Sekunden)
+INITIAL_SERVICE_S = _env_float("PREDICT_INITIAL_SERVICE_S", 1.0)         # Startwert für EWMA, bis echte Messungen vorliegen
+INITIAL_BATCH_S   = _env_float("PREDICT_INITIAL_BATCH_S", 4.0)           # Startwert für die EWMA eines Video-Batches
+RATE_PER_S        = _env_float("PREDICT_RATE_PER_S", 0.5)                # Token-Nachfüllrate pro Client (Requests/Sekunde)
+RATE_BURST        = _env_float("PREDICT_RATE_BURST", 5.0)                # Bucket-Größe (kurzer Burst erlaubt)
+
+
+class Rejected(Exception):
+    """
+    Request wird nicht angenommen. Trägt HTTP-Status (429/503),
+    Retry-After in Sekunden und eine kurze Begründung für die JSON-Antwort.
+    """
+    def __init__(self, status_code: int, retry_after: float, reason: str):
+        super().__init__(reason)
+        self.status_code = status_code
+        self.retry_after = max(1, math.ceil(retry_after))   # Retry-After muss ganze Sekunden >= 1 sein
+        self.reason = reason
+
+
+class Deadline:
+    """
+    Absoluter Zeitpunkt (time.monotonic), bis zu dem ein Request fertig sein muss.
+    Wird an run_inference() und get_nutrition_bulk() weitergegeben.
+    """
+    def __init__(self, seconds: float):
+        self.at = time.monotonic() + seconds
+
+    def remaining(self) -> float:
+        return self.at - time.monotonic()
+
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+
+class TokenBucket:
+    """
+    Klassischer Token-Bucket: 'rate' Tokens pro Sekunde, maximal 'burst' Tokens.
+    """
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_take(self) -> float:
+        """
+        Nimmt ein Token. Rückgabe 0.0 bei Erfolg, sonst Sekunden bis zum nächsten Token.
+        """
+        now = time.monotonic()
+        self._refill(now)
+        if self.tokens >= 1.0:
+            self.tokens -= 1.0
+            return 0.0
+        if self.rate <= 0:
+            return float("inf")
+        return (1.0 - self.tokens) / self.rate
+
+
+class RateLimiter:
+    """
+    Token-Buckets pro Client-Schlüssel (IP). Inaktive, volle Buckets werden
+    gelegentlich entfernt, damit der Speicher nicht mit jeder IP wächst.
+    """
+    def __init__(self, rate: float, burst: float, max_clients: int = 10_000):
+        self.rate = rate
+        self.burst = burst
+        self.max_clients = max_clients
+        self._buckets: dict[str, TokenBucket] = {}
+
+    def _prune(self) -> None:
+        now = time.monotonic()
+        full_after = self.burst / self.rate if self.rate > 0 else float("inf")
+        for key in [k for k, b in self._buckets.items() if now - b.updated >= full_after]:
+            del self._buckets[key]                              # Bucket wäre ohnehin wieder voll
+
+    def check(self, client_key: str) -> None:
+        """
+        Wirft Rejected(429), wenn der Client sein Kontingent aufgebraucht hat.
+        """
+        if self.rate <= 0 and self.burst <= 0:
+            return                                              # Rate-Limit deaktiviert
+        bucket = self._buckets.get(client_key)
+        if bucket is None:
+            if len(self._buckets) >= self.max_clients:
+                self._prune()
+            bucket = self._buckets[client_key] = TokenBucket(self.rate, self.burst)
+        wait = bucket.try_take()
+        if wait > 0:
+            raise Rejected(429, wait, "rate limit exceeded")
+
+    def stats(self) -> dict:
+        return {"clients": len(self._buckets), "rate_per_s": self.rate, "burst": self.burst}
+
+
+class SlotTicket:
+    """
+    Wird von AdmissionController.slot() geliefert. skip() markiert einen Slot,
+    dessen Dauer nicht in die EWMA soll (z. B. Client vor der Inferenz weg -> 499).
+    """
+    def __init__(self):
+        self.skipped = False
+
+    def skip(self) -> None:
+        self.skipped = True
+
+
+class AdmissionController:
+    """
+    Begrenzte Anzahl Inferenz-Slots + begrenzte Warteschlange.
+    Nur im Event-Loop benutzen (keine Thread-Sicherheit nötig).
+    """
+    def __init__(self, max_inflight: int, max_queue: int, initial_service_s: float,
+                 initial_batch_s: float = INITIAL_BATCH_S):
+        self.max_inflight = max_inflight
+        self.max_queue = max_queue
+        self.service_s = initial_service_s                      # EWMA der Bearbeitungszeit pro Request
+        self.batch_service_s = initial_batch_s                  # EWMA pro Video-Batch (eigene Schätzung)
+        self.batches = 0                                        # davon Video-Batches (wartend + laufend)
+        self.inflight = 0
+        self.queued = 0
+        self.rejected = 0
+        self.expired = 0
+        self._sem = asyncio.Semaphore(max_inflight)
+
+    def estimated_wait(self) -> float:
+        """
+        Geschätzte Wartezeit für einen neu ankommenden Request (Sekunden):
+        alle Requests vor ihm (wartend + laufend) verteilt auf die Slots.
+        Video-Batches zählen mit ihrer eigenen EWMA statt der Einzelbild-EWMA.
+        """
+        ahead = self.queued + self.inflight
+        if ahead < self.max_inflight:
+            return 0.0
+        images = ahead - self.batches
+        return (self.batches * self.batch_service_s
+                + max(0, images - self.max_inflight + 1) * self.service_s) / self.max_inflight
+
+    def _record(self, seconds: float, video: bool, alpha: float = 0.2) -> None:
+        if video:
+            self.batch_service_s = (1 - alpha) * self.batch_service_s + alpha * seconds
+        else:
+            self.service_s = (1 - alpha) * self.service_s + alpha * seconds
+
+    @asynccontextmanager
+    async def slot(self, deadline: Deadline, video: bool = False):
+        """
+        Reserviert einen Inferenz-Slot. Lehnt sofort ab (503), wenn
+        - die Warteschlange voll ist, oder
+        - die geschätzte Wartezeit + Bearbeitungszeit die Deadline überschreitet.
+        Läuft die Deadline beim Warten ab, wird ebenfalls mit 503 abgebrochen.
+        Die Dauer geht nur in die EWMA ein, wenn der Block normal endet (keine
+        Exception wie TimeoutError, kein ticket.skip()) -> abgebrochene Requests
+        ohne Inferenz ziehen die Schätzung nicht nach unten.
+        video=True: Slot für EINEN Video-Batch (nicht das ganze Video), damit
+        Einzelbilder zwischen den Batches drankommen; eigene EWMA.
+        """
+        wait = self.estimated_wait()
+        expected = self.batch_service_s if video else self.service_s
+        # inflight + queued zählt auch Requests, die gerade auf den Semaphore warten
+        # (inflight steigt erst nach acquire) -> Burst im selben Tick wird korrekt begrenzt
+        if self.inflight + self.queued >= self.max_inflight + self.max_queue:
+            self.rejected += 1
+            raise Rejected(503, wait, "queue full")
+        if wait + expected > deadline.remaining():
+            self.rejected += 1
+            raise Rejected(503, wait, "estimated wait exceeds deadline")
+
+        self.queued += 1
+        if video:
+            self.batches += 1
+        try:
+            try:
+                await asyncio.wait_for(self._sem.acquire(), timeout=max(0.0, deadline.remaining()))
+            except asyncio.TimeoutError:
+                self.expired += 1
+                raise Rejected(503, self.estimated_wait(), "deadline expired in queue")
+            finally:
+                self.queued -= 1
+
+            self.inflight += 1
+            t0 = time.perf_counter()
+            ticket = SlotTicket()
+            try:
+                yield ticket
+                if not ticket.skipped:                              # nur bei normalem Ende (nicht bei Exceptions)
+                    self._record(time.perf_counter() - t0, video)
+            finally:
+                self.inflight -= 1
+                self._sem.release()
+        finally:
+            if video:
+                self.batches -= 1
+
+    def stats(self) -> dict:
+        return {
+            "inflight": self.inflight,
+            "queued": self.queued,
+            "max_inflight": self.max_inflight,
+            "max_queue": self.max_queue,
+            "service_s_ewma": round(self.service_s, 3),
+            "batch_service_s_ewma": round(self.batch_service_s, 3),
+            "estimated_wait_s": round(self.estimated_wait(), 3),
+            "rejected": self.rejected,
+            "expired": self.expired,
+        }
+
+
+# Globale Instanzen (ein uvicorn-Prozess -> ein Controller)
+admission = AdmissionController(MAX_INFLIGHT, MAX_QUEUE, INITIAL_SERVICE_S)
+rate_limiter = RateLimiter(RATE_PER_S, RATE_BURST)
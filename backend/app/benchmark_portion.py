@@ -0,0 +1,55 @@
+# benchmark_portion.py
+# ------------------------------------------------------------
+# Mikro-Benchmark für die Portionsschätzung (portion.add_portions), um zu
+# zeigen, dass die Summen pro Mahlzeit die /predict-Latenz nicht merklich
+# erhöhen (Vergleich: YOLO-Inferenz liegt im Bereich von 100+ ms auf CPU).
+#
+# Aufruf (im Ordner backend/app):
+#   python benchmark_portion.py
+# Ausgabe: mittlere und p95-Dauer pro Aufruf für verschiedene Item-Anzahlen.
+# ------------------------------------------------------------
+
+import random
+import statistics
+import time
+from portion import add_portions, PORTION_PRIORS
+
+IMAGE_SIZE = [1280, 960]
+ITERATIONS = 2000
+ITEM_COUNTS = (1, 5, 20, 100)
+
+
+def make_items(n: int, rng: random.Random) -> list[dict]:
+    # Synthetische Items im /predict-Format (Label, Box, Nährwerte pro 100 g)
+    labels = list(PORTION_PRIORS)
+    items = []
+    for _ in range(n):
+        x1, y1 = rng.uniform(0, 900), rng.uniform(0, 700)
+        w, h = rng.uniform(40, 380), rng.uniform(40, 260)
+        nutrition = None if rng.random() < 0.2 else {
+            "energy_kcal": rng.uniform(20, 400), "fat_g": rng.uniform(0, 30), "carbs_g": rng.uniform(0, 60),
+            "sugars_g": rng.uniform(0, 30), "protein_g": rng.uniform(0, 25),
+        }
+        items.append({"label": rng.choice(labels), "confidence": 0.8,
+                      "bbox": [x1, y1, x1 + w, y1 + h], "nutrition_per_100g": nutrition})
+    return items
+
+
+def main() -> None:
+    rng = random.Random(42)
+    print(f"{'items':>6} {'mean_ms':>9} {'p95_ms':>9}")
+    for n in ITEM_COUNTS:
+        items = make_items(n, rng)
+        add_portions(items, IMAGE_SIZE)                     # Warm-up (numpy-Imports/Caches)
+        durations = []
+        for _ in range(ITERATIONS):
+            t0 = time.perf_counter()
+            add_portions(items, IMAGE_SIZE)
+            durations.append((time.perf_counter() - t0) * 1000.0)
+        durations.sort()
+        p95 = durations[int(len(durations) * 0.95)]
+        print(f"{n:>6} {statistics.mean(durations):>9.4f} {p95:>9.4f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+# circuit_breaker.py
+# ------------------------------------------------------------
+# Einfacher Circuit Breaker für externe Abhängigkeiten (hier: OpenFoodFacts).
+#
+# Zustände:
+# - closed:    normale Anfragen; Ergebnisse landen in einem rollierenden Fenster.
+# - open:      Fehler- oder Langsam-Quote über Schwelle -> Anfragen werden sofort
+#              abgelehnt (allow() == False), bis open_s Sekunden vergangen sind.
+# - half_open: danach genau eine Probe-Anfrage; Erfolg -> closed, Fehler -> open.
+#
+# Thread-sicher (Lock), da OFF-Abfragen im Threadpool laufen.
+# ------------------------------------------------------------
+
+import threading
+import time
+from collections import deque
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    def __init__(self,
+                 window: int = 20,                  # Anzahl letzter Aufrufe im Fenster
+                 min_calls: int = 5,                # erst ab so vielen Aufrufen bewerten
+                 failure_rate: float = 0.5,         # Fehlerquote, ab der geöffnet wird
+                 slow_call_s: float = 3.0,          # ab dieser Dauer gilt ein Aufruf als "langsam"
+                 slow_rate: float = 0.8,            # Langsam-Quote, ab der geöffnet wird
+                 open_s: float = 30.0):             # Wartezeit im Zustand open bis zur Probe
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.slow_call_s = slow_call_s
+        self.slow_rate = slow_rate
+        self.open_s = open_s
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self.times_opened = 0
+        self.short_circuited = 0                    # wegen open abgelehnte Aufrufe
+        self._calls: deque[tuple[bool, bool]] = deque(maxlen=window)   # (fehler, langsam)
+        self._probe_inflight = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """
+        Darf eine Anfrage gestartet werden? Im Zustand half_open wird genau
+        eine Probe zugelassen, alle weiteren warten auf deren Ergebnis.
+        """
+        with self._lock:
+            if self.state == OPEN and time.monotonic() - self.opened_at >= self.open_s:
+                self.state = HALF_OPEN
+                self._probe_inflight = False
+            if self.state == CLOSED:
+                return True
+            if self.state == HALF_OPEN and not self._probe_inflight:
+                self._probe_inflight = True
+                return True
+            self.short_circuited += 1
+            return False
+
+    def record_success(self, duration_s: float) -> None:
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self._close()
+                return
+            self._calls.append((False, duration_s >= self.slow_call_s))
+            self._evaluate()
+
+    def record_failure(self) -> None:
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self._open()
+                return
+            self._calls.append((True, False))
+            self._evaluate()
+
+    # ---- intern (Lock wird vom Aufrufer gehalten) ----------
+    def _evaluate(self) -> None:
+        n = len(self._calls)
+        if self.state != CLOSED or n < self.min_calls:
+            return
+        failures = sum(1 for failed, _ in self._calls if failed)
+        slow = sum(1 for _, is_slow in self._calls if is_slow)
+        if failures / n >= self.failure_rate or slow / n >= self.slow_rate:
+            self._open()
+
+    def _open(self) -> None:
+        self.state = OPEN
+        self.opened_at = time.monotonic()
+        self.times_opened += 1
+        self._probe_inflight = False
+
+    def _close(self) -> None:
+        self.state = CLOSED
+        self._calls.clear()
+        self._probe_inflight = False
+
+    def stats(self) -> dict:
+        with self._lock:
+            n = len(self._calls)
+            failures = sum(1 for failed, _ in self._calls if failed)
+            slow = sum(1 for _, is_slow in self._calls if is_slow)
+            return {
+                "state": self.state,
+                "window_calls": n,
+                "failure_rate": round(failures / n, 3) if n else 0.0,
+                "slow_rate": round(slow / n, 3) if n else 0.0,
+                "times_opened": self.times_opened,
+                "short_circuited": self.short_circuited,
+                "open_remaining_s": round(max(0.0, self.open_s - (time.monotonic() - self.opened_at)), 1)
+                                    if self.state == OPEN else 0.0,
+            }
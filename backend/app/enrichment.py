@@ -0,0 +1,204 @@
+# enrichment.py
+# ------------------------------------------------------------
+# Asynchrone Nährwert-Anreicherung für /predict:
+# - Detections stehen nach der Inferenz sofort bereit; die OFF-Abfragen
+#   laufen danach pro Label parallel im Threadpool.
+# - Alle OFF-Abfragen (auch /predict ohne Streaming und /predict-video) laufen
+#   über lookup_bulk(): ein gemeinsamer Semaphore begrenzt die gleichzeitigen
+#   Abfragen über alle Requests, damit der OFF-Executor nicht überläuft.
+# - Jedes fertige Label wird als Event in eine asyncio.Queue gelegt
+#   (für Streaming: NDJSON/SSE) und im ResultStore festgehalten
+#   (für Polling per GET /predict/{image_id}).
+#
+# nutrition_status pro Item:
+#   "loading"   -> Abfrage läuft noch
+#   "ok"        -> Nährwerte gefunden
+#   "not_found" -> OFF ohne Treffer
+#   "pending"   -> OFF gerade nicht verfügbar (Breaker offen/Deadline abgelaufen);
+#                  wird beim nächsten Polling erneut abgefragt (retry_pending),
+#                  sobald der Breaker wieder Anfragen zulässt
+# ------------------------------------------------------------
+
+import asyncio                                  # Hintergrund-Task + Event-Queue
+import json                                     # Stream-Zeilen (NDJSON/SSE)
+import time                                     # TTL der gespeicherten Ergebnisse
+from collections import OrderedDict
+from fastapi.concurrency import run_in_threadpool
+from openfoodfacts_client import get_nutrition_bulk, off_breaker, OFF_MAX_INFLIGHT
+from portion import add_portions
+
+RESULT_TTL_S = 15 * 60                          # Ergebnisse 15 min abrufbar
+RESULT_MAX_ENTRIES = 500                        # Obergrenze, damit der Speicher begrenzt bleibt
+RETRY_PENDING_S = 10.0                          # "pending"-Labels höchstens so oft pro Ergebnis neu abfragen
+MAX_LOOKUPS = max(1, OFF_MAX_INFLIGHT // 2)     # gleichzeitige Abfragen über alle Requests (Rest: Platz für Hedges)
+
+_lookups = asyncio.Semaphore(MAX_LOOKUPS)
+
+
+def label_key(p: dict) -> str:
+    # gleiche Normalisierung wie get_nutrition_bulk (Schlüssel: Label in lowercase)
+    return (p.get("label") or "").strip().lower()
+
+
+class ResultStore:
+    """
+    In-Memory-Ablage der /predict-Ergebnisse, gekeyt über image_id.
+    Älteste Einträge fliegen raus (TTL und Maximalgröße).
+    """
+    def __init__(self, ttl_s: float, max_entries: int):
+        self.ttl_s = ttl_s
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, dict]" = OrderedDict()
+
+    def _evict(self) -> None:
+        now = time.monotonic()
+        while self._entries:
+            oldest = next(iter(self._entries.values()))
+            if len(self._entries) <= self.max_entries and now - oldest["created"] < self.ttl_s:
+                break
+            self._entries.popitem(last=False)
+
+    def create(self, image_id: str, predictions: list[dict], meta: dict,
+               image_size: list[int] | None = None) -> dict:
+        entry = {
+            "image_id": image_id,
+            "meta": meta,                                   # sha256, storage (unverändert in Antwort)
+            "image_size": image_size,                       # nur intern (Portionsschätzung), nicht in der Antwort
+            "predictions": predictions,
+            "nutrition": {},                                # { "<label>": {...} | None }
+            "status": {label_key(p): "loading" for p in predictions if label_key(p)},
+            "done": False,
+            "created": time.monotonic(),
+            "retried": time.monotonic(),                    # letzter (Erst-)Versuch für "pending"-Labels
+        }
+        self._entries[image_id] = entry
+        self._evict()
+        return entry
+
+    def get(self, image_id: str) -> dict | None:
+        self._evict()
+        return self._entries.get(image_id)
+
+
+def snapshot(entry: dict) -> dict:
+    """
+    Aktueller Stand eines Eintrags im gleichen Antwortschema wie /predict.
+    meal_totals berücksichtigt nur bereits geladene Nährwerte (noch ladende
+    Items stehen in "items_loading", nicht in "missing").
+    """
+    items = []
+    for p in entry["predictions"]:
+        key = label_key(p)
+        items.append({
+            **p,
+            "nutrition_per_100g": entry["nutrition"].get(key),
+            "nutrition_status": entry["status"].get(key, "not_found"),
+        })
+    items, totals = add_portions(items, entry["image_size"])
+    return {
+        "items": items,
+        "image_id": entry["image_id"],
+        **entry["meta"],
+        "done": entry["done"],
+        "degraded": any(s == "pending" for s in entry["status"].values()),
+        "meal_totals": totals,
+    }
+
+
+async def lookup_bulk(labels: list[str], deadline, pending: set[str]) -> dict[str, dict | None]:
+    """
+    get_nutrition_bulk im Threadpool, sobald einer der MAX_LOOKUPS Plätze frei ist.
+    Wird vor Ablauf der Deadline kein Platz frei, landen alle Labels in 'pending'.
+    """
+    try:
+        await asyncio.wait_for(_lookups.acquire(),
+                               timeout=None if deadline is None else max(0.0, deadline.remaining()))
+    except asyncio.TimeoutError:
+        keys = {(lbl or "").strip().lower() for lbl in labels} - {""}
+        pending.update(keys)
+        return {key: None for key in keys}
+    try:
+        return await run_in_threadpool(get_nutrition_bulk, labels, deadline, pending)
+    finally:
+        _lookups.release()
+
+
+async def _lookup_one(key: str, deadline) -> tuple[str, dict | None, str]:
+    pending: set[str] = set()
+    try:
+        nutrition_map = await lookup_bulk([key], deadline, pending)
+    except Exception:
+        # unerwarteter Fehler soll den Stream nicht abbrechen -> wie "nicht verfügbar" behandeln
+        return key, None, "pending"
+    nutrition = nutrition_map.get(key)
+    status = "pending" if key in pending else ("ok" if nutrition else "not_found")
+    return key, nutrition, status
+
+
+def start_enrichment(entry: dict, deadline, keys: list[str] | None = None) -> asyncio.Queue:
+    """
+    Startet die OFF-Abfragen aller Labels (oder nur 'keys') parallel als Hintergrund-Task.
+    Rückgabe: Queue mit Events {"type": "nutrition", ...} und abschließend
+    {"type": "done", ...}. Der Task läuft auch weiter, wenn niemand die
+    Queue liest (Client nutzt Polling oder hat den Stream abgebrochen).
+    """
+    queue: asyncio.Queue = asyncio.Queue()
+
+    async def run():
+        tasks = [asyncio.create_task(_lookup_one(key, deadline)) for key in (keys or list(entry["status"]))]
+        for fut in asyncio.as_completed(tasks):
+            key, nutrition, status = await fut
+            entry["nutrition"][key] = nutrition
+            entry["status"][key] = status
+            await queue.put({"type": "nutrition", "label": key,
+                             "nutrition_per_100g": nutrition, "nutrition_status": status})
+        entry["done"] = True
+        final = snapshot(entry)
+        await queue.put({"type": "done", "image_id": entry["image_id"],
+                         "degraded": final["degraded"], "meal_totals": final["meal_totals"]})
+
+    entry["task"] = asyncio.create_task(run())          # Referenz halten, sonst kann der GC den Task einsammeln
+    return queue
+
+
+async def stream_events(entry: dict, queue: asyncio.Queue, mode: str):
+    """
+    Erzeugt die Stream-Zeilen für StreamingResponse: zuerst alle Detections,
+    dann pro Label die Nährwerte, zuletzt "done".
+    mode "sse": Server-Sent Events (Zeilen "event:" + "data:", Leerzeile als Trenner),
+    sonst NDJSON (eine JSON-Zeile pro Event).
+    """
+    def fmt(event: dict) -> str:
+        data = json.dumps(event, ensure_ascii=False)
+        return f"event: {event['type']}\ndata: {data}\n\n" if mode == "sse" else data + "\n"
+
+    yield fmt({"type": "detections", **snapshot(entry)})
+    while True:
+        event = await queue.get()
+        yield fmt(event)
+        if event["type"] == "done":
+            break
+
+
+def retry_pending(entry: dict, deadline) -> bool:
+    """
+    Fragt Labels mit Status "pending" erneut ab (beim Polling), sobald der
+    Circuit Breaker wieder Anfragen zulässt; höchstens alle RETRY_PENDING_S Sekunden.
+    Die Labels stehen danach auf "loading", "done" wird wieder False.
+    Rückgabe: True, wenn eine neue Abfrage gestartet wurde.
+    """
+    keys = [key for key, status in entry["status"].items() if status == "pending"]
+    if not keys or not entry["done"]:
+        return False                                    # nichts offen oder Abfrage läuft noch
+    now = time.monotonic()
+    if now - entry["retried"] < RETRY_PENDING_S or off_breaker.stats()["open_remaining_s"] > 0:
+        return False
+    entry["retried"] = now
+    for key in keys:
+        entry["status"][key] = "loading"
+    entry["done"] = False
+    start_enrichment(entry, deadline, keys)
+    return True
+
+
+results = ResultStore(RESULT_TTL_S, RESULT_MAX_ENTRIES)
@@ -9,27 +9,45 @@
 # - /model-info: Modellnamen an Frontend melden.
 # - /feedback: Nutzerfeedback in JSON-Datei anhängen.
 #              Verschiebt Bild bei vorhandenem image_id von tmp -> uploads.
+# - /predict-video: Kurzen Clip analysieren (Frame-Sampling, Batch-Inferenz,
+#             Tracking -> eindeutige Objekte), Nährwerte einmal pro Label.
+# - /predict/{image_id}: Polling-Fallback für gestreamte/asynchrone /predict-Ergebnisse.
+# - /metrics: Zustand der Admission-Control (Slots, Queue, Ablehnungen)
+#             und des OFF-Circuit-Breakers (Hedging/Retries).
 # ------------------------------------------------------------
 
 from fastapi import FastAPI, UploadFile, File, Request                  # Webframework & Upload-Handling & Feedback-Endpoint (JSON-Body)
 from fastapi.middleware.cors import CORSMiddleware                      # CORS-Header erlauben Cross-Origin-Frontend
+from fastapi.responses import JSONResponse, Response, StreamingResponse # 429/503-Antworten mit Retry-After, NDJSON/SSE-Streaming
+from fastapi.concurrency import run_in_threadpool                       # CPU-/IO-blockierende Aufrufe aus dem Event-Loop auslagern
 from datetime import datetime
 from zoneinfo import ZoneInfo
 # import json
 import hashlib, uuid, os, json, shutil, time                            # UUIDs für Feedback-IDs, Hashing, Dateizugriff, Dateimanagement, Temp-Cleanup
+import asyncio                                                          # Video: Admission-Slot pro Batch aus dem Worker-Thread holen
 from pathlib import Path
-from yolo_predict import run_inference, get_model_name                  # eigene Inferenz & Modellinfo
-from openfoodfacts_client import get_nutrition_bulk                     # Batch-Funktion: Labels -> Nährwerte
+from yolo_predict import run_inference, run_inference_batch, get_model_name   # eigene Inferenz (Einzelbild/Batch) & Modellinfo
+from video_predict import analyze_video, DEFAULT_SAMPLE_FPS             # Video-Analyse (Sampling + Tracking)
+from openfoodfacts_client import get_off_stats                          # OFF-Kennzahlen (Breaker, Hedging)
+from admission import admission, rate_limiter, Deadline, Rejected, DEADLINE_S   # Admission-Control & Rate-Limit
+from enrichment import results, snapshot, start_enrichment, retry_pending, lookup_bulk, stream_events   # Nährwert-Anreicherung (Streaming/Polling, begrenzte OFF-Abfragen)
+from portion import add_portions                                        # Portionsschätzung + Mahlzeit-Summen
 
 app = FastAPI()                                                         # FastAPI-App anlegen
 
 # --- CORS für Frontend-Zugriff ---
+# Erlaubte Frontend-URLs kommagetrennt per Env überschreibbar.
+# Default: lokales Vite-Frontend + Frontend auf der EC2 (frontend-copy: "serve -s dist -l 3000")
+CORS_ALLOW_ORIGINS = [o.strip() for o in os.getenv(
+    "CORS_ALLOW_ORIGINS",
+    "http://localhost:5173,http://127.0.0.1:5173,http://63.178.179.86:3000").split(",") if o.strip()]
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],                                                # später evtl. einschränken auf Frontend-URL
-    allow_credentials=True,
-    allow_methods=["*"],
+    allow_origins=CORS_ALLOW_ORIGINS,                                   # nur bekannte Frontend-URLs
+    allow_credentials=False,                                            # Frontend nutzt keine Cookies
+    allow_methods=["GET", "POST"],
     allow_headers=["*"],
+    expose_headers=["Retry-After"],                                     # Frontend darf Retry-After lesen
 )
 
 # Zentrale Pfade (relativ zum Backend-Verzeichnis)
@@ -44,6 +62,12 @@ FEEDBACK_DIR.mkdir(parents=True, exist_ok=True)
 if not FEEDBACK_FILE.exists():                                          # Feedback-Datei anlegen, falls nicht vorhanden
     FEEDBACK_FILE.write_text("[]", encoding="utf-8")                    # Leeres JSON-Array
 
+# Grenzen für /predict-video
+VIDEO_MAX_BYTES  = int(os.getenv("VIDEO_MAX_BYTES", 100 * 1024 * 1024))  # max. Upload-Größe (100 MB)
+VIDEO_DEADLINE_S = float(os.getenv("VIDEO_DEADLINE_S", 60.0))            # Zeitbudget pro Video (gesamt)
+VIDEO_NUTRITION_S = float(os.getenv("VIDEO_NUTRITION_S", 8.0))          # davon reserviert für OFF-Abfragen
+VIDEO_MAX_FPS    = 10.0                                                  # Obergrenze für Sampling-Rate
+
 # ------------------------------------------------------------
 # Einfacher Aufräumer für temporäre Uploads (älter als X Stunden)
 # Kann bei jedem /predict kurz laufen (kostet wenig)
@@ -58,6 +82,23 @@ def cleanup_tmp(max_age_hours: int = 24) -> None:                       # Aufrä
     except Exception:                                                   # Bei Fehlern -> ignorieren (stilles Aufräumen)
         pass
 
+# ------------------------------------------------------------
+# Hilfsfunktionen für Admission-Control
+# ------------------------------------------------------------
+def client_key(request: Request) -> str:
+    # Client-IP als Schlüssel für das Rate-Limit (uvicorn mit --proxy-headers
+    # setzt hier bereits die echte IP hinter einem Reverse-Proxy)
+    return request.client.host if request.client else "unknown"
+
+
+def reject(e: Rejected) -> JSONResponse:
+    # 429 (Rate-Limit) bzw. 503 (überlastet/Deadline) mit Retry-After-Header
+    return JSONResponse(
+        status_code=e.status_code,
+        content={"status": "error", "message": e.reason, "retry_after": e.retry_after},
+        headers={"Retry-After": str(e.retry_after)},
+    )
+
 # ------------------------------------------------------------
 # /healthz
 # - Liefert einfachen Healthcheck 
@@ -67,6 +108,18 @@ async def healthz():
     return {"status": "ok"}
 
 
+# ------------------------------------------------------------
+# /metrics
+# - Liefert Zustand der Admission-Control, des Rate-Limits und des
+#   OpenFoodFacts-Clients (Circuit Breaker, Hedging, Retries) als JSON
+# ------------------------------------------------------------
+@app.get("/metrics")
+async def metrics():
+    return {"admission": admission.stats(),
+            "rate_limit": rate_limiter.stats(),
+            "openfoodfacts": get_off_stats()}
+
+
 # ------------------------------------------------------------
 # /model-info
 # - Liefert nur den Modellnamen (Anzeige im Frontend-Header)
@@ -93,11 +146,33 @@ async def get_labels():
 # - Führt YOLO aus
 # - Fragt für jedes erkannte Label die Nährwerte (pro 100 g) bei OFF ab
 # - Mischt Nährwerte in jedes Prediction-Item unter "nutrition_per_100g"
+# - Schätzt pro Item die Portion in Gramm ("portion_g", aus Box-/Maskenfläche)
+#   und liefert Summen pro Mahlzeit ("meal_totals", mit unterer/oberer Grenze)
 # - Erzeugt image_id (UUID) + sha256, speichert Bild TEMPORÄR in tmp_uploads
 #         und gibt image_id/sha256 im JSON an das Frontend zurück.
+# - Admission-Control: 429 bei Rate-Limit pro Client, 503 + Retry-After,
+#   wenn die Warteschlange voll ist oder die geschätzte Wartezeit die
+#   Deadline übersteigt. Die Deadline wird an Inferenz und OFF durchgereicht.
+# - Optional ?stream=...:
+#   - "ndjson": eine JSON-Zeile pro Event (application/x-ndjson)
+#   - "sse":    Server-Sent Events (text/event-stream)
+#   - "poll":   Antwort sofort nach der Inferenz, Nährwerte per GET /predict/{image_id}
+#   Events: "detections" (Items mit nutrition_status "loading", direkt nach YOLO),
+#           "nutrition" (pro Label, sobald OFF antwortet), "done" (Ende).
 # ------------------------------------------------------------
 @app.post("/predict")
-async def predict(file: UploadFile = File(...)):
+async def predict(request: Request, file: UploadFile = File(...), stream: str | None = None):
+    if stream not in (None, "ndjson", "sse", "poll"):
+        return JSONResponse(status_code=400, content={"status": "error", "message": f"unknown stream mode: {stream}"})
+
+    deadline = Deadline(DEADLINE_S)                      # Zeitbudget für diesen Request
+
+    # Rate-Limit pro Client (Token-Bucket) -> schnelle 429-Ablehnung
+    try:
+        rate_limiter.check(client_key(request))
+    except Rejected as e:
+        return reject(e)
+
     # Temp-Cleanup bei jedem Request
     cleanup_tmp(24)
 
@@ -118,8 +193,31 @@ async def predict(file: UploadFile = File(...)):
     #     f.write(image_bytes)
 
     # 2) YOLO-Inferenz durchführen -> {"predictions": [ { label, confidence, ... }, ... ]}
-    result = run_inference(image_bytes)
+    #    Nur mit freiem Slot (begrenzte Parallelität), im Threadpool, damit der
+    #    Event-Loop weiter Requests annehmen/ablehnen kann.
+    try:
+        async with admission.slot(deadline) as ticket:
+            if await request.is_disconnected():          # Client hat aufgegeben -> keine CPU verschwenden
+                ticket.skip()                            # keine Inferenz -> nicht in die EWMA
+                return Response(status_code=499)
+            result = await run_in_threadpool(run_inference, image_bytes, deadline)
+    except Rejected as e:
+        return reject(e)
+    except TimeoutError:
+        return reject(Rejected(503, admission.estimated_wait(), "deadline expired"))
     predictions = result.get("predictions", [])
+    meta = {"sha256": sha256, "storage": "temp"}
+    image_size = result.get("image_size")
+
+    # 2b) Asynchrone Modi: Detections sofort liefern, Nährwerte nachreichen
+    if stream is not None:
+        entry = results.create(image_id, predictions, meta, image_size)
+        queue = start_enrichment(entry, deadline)
+        if stream == "poll":
+            return snapshot(entry)
+        return StreamingResponse(stream_events(entry, queue, stream),
+                                 media_type="text/event-stream" if stream == "sse" else "application/x-ndjson",
+                                 headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
 
     # 3) Alle Label-Namen einsammeln (nur die, die vorhanden sind)
     labels = []
@@ -128,28 +226,166 @@ async def predict(file: UploadFile = File(...)):
         if lbl:
             labels.append(lbl)
 
-    # 4) Nährwertdaten in einem Rutsch holen (lru_cache im Client verhindert Doppelanfragen)
+    # 4) Nährwertdaten in einem Rutsch holen (Cache im Client verhindert Doppelanfragen)
     #    Rückgabe-Form: { "<label in lowercase>": { ...naehrwerte... } | None }
-    nutrition_map = get_nutrition_bulk(labels)
+    #    Die Deadline begrenzt die OFF-Abfragen. Ist OFF nicht erreichbar (Circuit
+    #    Breaker offen) oder läuft die Deadline ab, landen die Labels in 'pending'
+    #    und die Detections werden trotzdem sofort zurückgegeben (degradierter Modus).
+    #    lookup_bulk begrenzt die gleichzeitigen OFF-Abfragen über alle Requests.
+    if await request.is_disconnected():
+        return Response(status_code=499)
+    pending: set[str] = set()
+    nutrition_map = await lookup_bulk(labels, deadline, pending)
 
     # 5) Predictions anreichern: Für jedes Item die passenden Nährwerte dranhängen
+    #    nutrition_status: "ok" | "not_found" (OFF ohne Treffer) | "pending" (OFF gerade nicht verfügbar)
     enriched_items = []
     for p in predictions:
         key = (p.get("label") or "").strip().lower()
+        nutrition = nutrition_map.get(key)
         enriched_items.append({
             **p,  # behält class_id, label, confidence, ggf. bbox
-            "nutrition_per_100g": nutrition_map.get(key)  # kann None sein, wenn OFF nichts Passendes hat
+            "nutrition_per_100g": nutrition,  # kann None sein, wenn OFF nichts Passendes hat
+            "nutrition_status": "pending" if key in pending else ("ok" if nutrition else "not_found"),
         })
 
+    # Portionen (Gramm) + Summen pro Mahlzeit (vektorisiert, < 1 ms)
+    enriched_items, totals = add_portions(enriched_items, image_size)
+
+    # Ergebnis auch für GET /predict/{image_id} ablegen
+    entry = results.create(image_id, predictions, meta, image_size)
+    entry["nutrition"].update(nutrition_map)
+    entry["status"].update({k: ("pending" if k in pending else ("ok" if v else "not_found"))
+                            for k, v in nutrition_map.items()})
+    entry["done"] = True
+
     # 6) Antwortschema, wie Frontend es nutzt:
     #    App.jsx erwartet { "items": [...] }
     return {"items": enriched_items,    # erkannte Objekte
             "image_id": image_id,       # eindeutige ID für das Bild
             "sha256": sha256,           # SHA256-Hash des Bildes
-            "storage": "temp"           # Speicherort des Bildes (Info für Debugging)
+            "storage": "temp",          # Speicherort des Bildes (Info für Debugging)
+            "done": True,               # alle Nährwerte abgefragt (wie bei Streaming/Polling)
+            "degraded": bool(pending),  # True, wenn Nährwerte (teilweise) ausstehen
+            "meal_totals": totals,      # Summen (kcal, Fett, KH, Zucker, Eiweiß) mit Grenzen
+           }
+
+
+# ------------------------------------------------------------
+# /predict-video
+# - Nimmt ein kurzes Video entgegen (multipart/form-data), speichert es
+#   chunkweise in tmp_uploads (OpenCV braucht einen Dateipfad)
+# - Sampling per ?fps=... (Default 2) oder ?scene_threshold=... (Szenenwechsel)
+# - Batch-Inferenz + IoU-Tracking -> pro Label Anzahl eindeutiger Objekte
+# - Nährwerte (pro 100 g) einmal pro Label via OFF
+# - Gleiche Admission-Control wie /predict (eigene, längere Deadline), aber ein
+#   Slot pro Inferenz-Batch statt für das ganze Video: Einzelbild-Requests
+#   laufen zwischen den Batches weiter. Läuft die Analyse-Deadline ab (oder wird
+#   ein späterer Batch abgelehnt), wird ein Teilergebnis mit "truncated": true geliefert.
+#   Die OFF-Abfragen haben ein eigenes Budget (VIDEO_NUTRITION_S), damit auch
+#   abgeschnittene Clips Nährwerte bekommen.
+# ------------------------------------------------------------
+@app.post("/predict-video")
+async def predict_video(request: Request, file: UploadFile = File(...),
+                        fps: float = DEFAULT_SAMPLE_FPS, scene_threshold: float | None = None):
+    deadline = Deadline(VIDEO_DEADLINE_S - VIDEO_NUTRITION_S)   # Analyse; Rest bleibt für OFF
+
+    try:
+        rate_limiter.check(client_key(request))
+    except Rejected as e:
+        return reject(e)
+    if not 0 < fps <= VIDEO_MAX_FPS:
+        return JSONResponse(status_code=400, content={"status": "error", "message": f"fps must be in (0, {VIDEO_MAX_FPS}]"})
+
+    cleanup_tmp(24)
+
+    # Video chunkweise auf Platte schreiben (nie komplett im Speicher)
+    video_id = uuid.uuid4().hex
+    suffix = Path(file.filename or "").suffix.lower() or ".mp4"
+    tmp_path = TMP_DIR / f"{video_id}{suffix}"
+    size = 0
+    try:
+        with open(tmp_path, "wb") as f:
+            while chunk := await file.read(1024 * 1024):
+                size += len(chunk)
+                if size > VIDEO_MAX_BYTES:
+                    return JSONResponse(status_code=413, content={"status": "error", "message": "video too large"})
+                f.write(chunk)
+
+        loop = asyncio.get_running_loop()
+        batches_done = 0
+
+        async def infer_batch(frames: list) -> list[list[dict]]:
+            async with admission.slot(deadline, video=True):
+                if await request.is_disconnected():      # Client weg -> restliche Batches sparen
+                    raise TimeoutError("client disconnected")
+                return await run_in_threadpool(run_inference_batch, frames, deadline)
+
+        def infer(frames: list) -> list[list[dict]]:
+            # läuft im Worker-Thread von analyze_video; Slot wird im Event-Loop geholt
+            nonlocal batches_done
+            try:
+                preds = asyncio.run_coroutine_threadsafe(infer_batch(frames), loop).result()
+            except Rejected:
+                if batches_done == 0:
+                    raise                                # erster Batch abgelehnt -> 503 wie /predict
+                raise TimeoutError("batch rejected")     # später -> Teilergebnis (truncated)
+            batches_done += 1
+            return preds
+
+        try:
+            if await request.is_disconnected():
+                return Response(status_code=499)
+            result = await run_in_threadpool(analyze_video, str(tmp_path), None if scene_threshold is not None else fps,
+                                              scene_threshold, deadline=deadline, infer=infer)
+        except Rejected as e:
+            return reject(e)
+        except ValueError as e:
+            return JSONResponse(status_code=400, content={"status": "error", "message": str(e)})
+    finally:
+        tmp_path.unlink(missing_ok=True)                 # Video wird nicht aufbewahrt
+
+    # Nährwerte einmal pro eindeutigem Label
+    labels = [it["label"] for it in result["items"]]
+    pending: set[str] = set()
+    nutrition_map = await lookup_bulk(labels, Deadline(VIDEO_NUTRITION_S), pending)
+
+    items = []
+    for it in result["items"]:
+        key = it["label"].strip().lower()
+        nutrition = nutrition_map.get(key)
+        items.append({
+            **it,
+            "nutrition_per_100g": nutrition,
+            "nutrition_status": "pending" if key in pending else ("ok" if nutrition else "not_found"),
+        })
+
+    return {"items": items,                             # ein Eintrag pro Label mit "count" eindeutiger Objekte
+            "video_id": video_id,
+            "frames_sampled": result["frames_sampled"],
+            "last_frame_s": result["last_frame_s"],
+            "truncated": result["truncated"],
+            "degraded": bool(pending),
            }
 
 
+# ------------------------------------------------------------
+# /predict/{image_id}
+# - Polling-Fallback: aktueller Stand eines /predict-Ergebnisses
+#   (Items mit nutrition_status, "done": true wenn alle Labels fertig sind)
+# - Labels mit "pending" werden erneut abgefragt, sobald OFF wieder erreichbar
+#   ist (Breaker nicht offen) -> kurz "loading", danach "ok"/"not_found"
+# - 404, wenn die image_id unbekannt oder abgelaufen ist
+# ------------------------------------------------------------
+@app.get("/predict/{image_id}")
+async def get_prediction(image_id: str):
+    entry = results.get(image_id)
+    if entry is None:
+        return JSONResponse(status_code=404, content={"status": "error", "message": "unknown or expired image_id"})
+    retry_pending(entry, Deadline(DEADLINE_S))
+    return snapshot(entry)
+
+
 # ------------------------------------------------------------
 # /feedback
 # - Hängt Feedback-Objekte an eine JSON-Datei an (einfaches Logging)
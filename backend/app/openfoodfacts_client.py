@@ -6,14 +6,28 @@
 # Design:
 # - Keine Übersetzungs-Tabelle (LABEL_MAP): Suche mit dem
 #   englischen YOLO-Label und probiere ein paar neutrale Varianten.
-# - @lru_cache reduziert wiederholte gleiche Anfragen in einer Session.
+# - Kleiner LRU-Cache (_CACHE) reduziert wiederholte gleiche Anfragen in einer Session.
+#   Ergebnisse, die wegen abgelaufener Deadline unvollständig sind, werden nicht gecacht.
+# - Resilienz gegenüber langsamem/ausgefallenem OFF:
+#   - Circuit Breaker (off_breaker): bei hoher Fehler-/Langsam-Quote werden
+#     keine Anfragen mehr gestartet -> NutritionPending sofort (degradierter Modus).
+#   - Hedged Request: bleibt die erste Anfrage länger als ~p95 der letzten
+#     Latenzen offen, wird eine zweite parallel gestartet; die schnellere gewinnt.
+#   - Höchstens OFF_MAX_INFLIGHT HTTP-Anfragen gleichzeitig (= Worker im Executor),
+#     Warten auf einen freien Worker zählt zur Deadline und zur gemessenen Dauer.
+#   - Retries mit exponentiellem Backoff + Jitter (begrenzt durch die Deadline).
 # - Robust gegenüber teilweise fehlenden Nährwertfeldern (kJ/kcal).
 # - Ergebnis-Format ist Frontend-freundlich.
 # ------------------------------------------------------------
 
-from functools import lru_cache            # einfacher In‑Memory‑Cache für Funktionsaufrufe
+from collections import OrderedDict, deque # In‑Memory‑LRU‑Cache, Latenz‑Fenster für p95
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED   # Hedged Requests
 import requests                            # HTTP‑Client für die OFF‑API
+import random                              # Jitter für Retry‑Backoff
 import re                                  # kleine String‑Normalisierung (optional)
+import threading                           # Lock für den Cache (Abfragen laufen im Threadpool)
+import time                                # Latenzmessung, Backoff
+from circuit_breaker import CircuitBreaker, CLOSED   # Schutz vor ausgefallenem/langsamem OFF
 
 # Basis‑URL der "klassischen" OFF‑Such‑API, liefert JSON
 OFF_SEARCH_URL = "https://world.openfoodfacts.org/cgi/search.pl"
@@ -27,6 +41,183 @@ HEADERS = {
 }
 
 OFF_TIMEOUT = (2.0, 5.0)  # connect, read 
+OFF_MIN_TIMEOUT = 0.2     # unterhalb dieser Restzeit lohnt keine neue Anfrage mehr
+
+# LRU-Cache: { "<query>": {...} | None }
+_CACHE: "OrderedDict[str, dict | None]" = OrderedDict()
+_CACHE_MAXSIZE = 256
+_CACHE_LOCK = threading.Lock()
+
+# ---- Resilienz-Einstellungen -------------------------------
+OFF_RETRIES = 1                # zusätzliche Versuche pro Anfrage nach Fehler
+OFF_BACKOFF_S = 0.25           # Basis für exponentiellen Backoff (mit Full Jitter)
+HEDGE_MIN_SAMPLES = 20         # erst ab so vielen Messungen wird gehedged
+HEDGE_MIN_DELAY_S = 0.3        # Untergrenze für die Hedge-Verzögerung
+HEDGE_MAX_DELAY_S = 3.0        # Obergrenze für die Hedge-Verzögerung
+OFF_MAX_INFLIGHT = 8           # gleichzeitige HTTP-Anfragen an OFF (inkl. Hedges und auslaufender Verlierer)
+
+off_breaker = CircuitBreaker(window=20, min_calls=5, failure_rate=0.5,
+                             slow_call_s=OFF_TIMEOUT[1] * 0.8, slow_rate=0.8, open_s=30.0)
+_latencies: deque[float] = deque(maxlen=200)     # erfolgreiche Latenzen (Sekunden) für p95
+_stats = {"requests": 0, "hedged": 0, "hedge_wins": 0, "retries": 0, "failures": 0}
+_STATS_LOCK = threading.Lock()                   # schützt _latencies und _stats (Lookups laufen parallel)
+_executor = ThreadPoolExecutor(max_workers=OFF_MAX_INFLIGHT, thread_name_prefix="off")
+_inflight = threading.BoundedSemaphore(OFF_MAX_INFLIGHT)   # ein Platz pro laufender Anfrage -> nie Warteschlange im Executor
+
+
+class NutritionPending(Exception):
+    """
+    Nährwerte konnten gerade nicht ermittelt werden (OFF nicht erreichbar,
+    Circuit Breaker offen oder Deadline abgelaufen). Ergebnis wird nicht gecacht,
+    ein späterer Versuch kann erfolgreich sein.
+    """
+
+
+def _timeout_for(deadline) -> tuple[float, float] | None:
+    """
+    Timeout für die nächste Anfrage, begrenzt durch die Restzeit der Deadline.
+    None = Deadline (fast) abgelaufen -> keine Anfrage mehr starten.
+    """
+    if deadline is None:
+        return OFF_TIMEOUT
+    remaining = deadline.remaining()
+    if remaining < OFF_MIN_TIMEOUT:
+        return None
+    return (min(OFF_TIMEOUT[0], remaining), min(OFF_TIMEOUT[1], remaining))
+
+
+def _hedge_delay() -> float | None:
+    """
+    Verzögerung bis zum Hedge-Request: p95 der letzten erfolgreichen Latenzen.
+    None = zu wenig Messwerte -> nicht hedgen.
+    """
+    with _STATS_LOCK:
+        samples = list(_latencies)                # Kopie unter Lock, sonst "deque mutated during iteration"
+    samples.sort()
+    if len(samples) < HEDGE_MIN_SAMPLES:
+        return None
+    p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+    return min(HEDGE_MAX_DELAY_S, max(HEDGE_MIN_DELAY_S, p95))
+
+
+def _get_json(params: dict, timeout: tuple[float, float]) -> dict:
+    """
+    Einzelne HTTP-Anfrage an OFF. Rückgabe: JSON.
+    """
+    r = requests.get(OFF_SEARCH_URL, params=params, headers=HEADERS, timeout=timeout)
+    r.raise_for_status()
+    return r.json()
+
+
+def _submit(params: dict, timeout: tuple[float, float], wait_s: float):
+    """
+    Startet eine Anfrage im Executor, sobald ein Platz frei ist (höchstens wait_s
+    Sekunden warten). Rückgabe: Future oder None (kein Platz frei geworden).
+    """
+    if not _inflight.acquire(timeout=max(0.0, wait_s)):
+        return None
+    fut = _executor.submit(_get_json, params, timeout)
+    fut.add_done_callback(lambda _: _inflight.release())   # Platz erst frei, wenn die Anfrage wirklich endet
+    return fut
+
+
+def _hedged_get(params: dict, timeout: tuple[float, float], deadline=None) -> tuple[dict, float]:
+    """
+    Startet die Anfrage; ist sie nach _hedge_delay() noch offen, wird eine
+    zweite identische Anfrage gestartet (nur wenn ein Platz frei ist -> bei
+    Sättigung keine Zusatzlast). Die erste erfolgreiche Antwort gewinnt.
+    Die unterlegene Anfrage läuft im Hintergrund aus (requests ist nicht abbrechbar)
+    und belegt bis dahin ihren Platz.
+    Gewartet wird höchstens min(sum(timeout), Restzeit der Deadline), inkl. Warten
+    auf einen freien Platz. Rückgabe: (JSON, Dauer inkl. Wartezeit).
+    Wirft NutritionPending (kein Platz frei) bzw. TimeoutError (Budget abgelaufen).
+    """
+    _count("requests")
+    t0 = time.perf_counter()
+    budget = sum(timeout) if deadline is None else min(sum(timeout), deadline.remaining())
+    end = t0 + budget
+    primary = _submit(params, timeout, budget)
+    if primary is None:
+        raise NutritionPending("off requests saturated")
+
+    futures = {primary}
+    hedge = None
+    delay = _hedge_delay()
+    if delay is not None and delay < end - time.perf_counter():
+        done, _ = wait(futures, timeout=delay)
+        if not done and off_breaker.state == CLOSED:   # keine Zusatzlast während Probe
+            hedge = _submit(params, timeout, 0.0)
+            if hedge is not None:
+                _count("hedged")
+                futures.add(hedge)
+
+    error: Exception | None = None
+    while futures:
+        done, futures = wait(futures, timeout=max(0.0, end - time.perf_counter()), return_when=FIRST_COMPLETED)
+        if not done:
+            raise TimeoutError("off request exceeded budget")
+        for fut in done:
+            try:
+                result = fut.result()
+            except Exception as e:
+                error = e
+                continue
+            if fut is hedge:
+                _count("hedge_wins")
+            return result, time.perf_counter() - t0
+    raise error
+
+
+def _search(params: dict, deadline=None) -> dict:
+    """
+    OFF-Suche mit Circuit Breaker, Hedging und Retries (Backoff mit Jitter).
+    Wirft NutritionPending, wenn OFF nicht (rechtzeitig) antwortet.
+    """
+    for attempt in range(OFF_RETRIES + 1):
+        timeout = _timeout_for(deadline)
+        if timeout is None:
+            raise NutritionPending("deadline expired")
+        if not off_breaker.allow():
+            raise NutritionPending("circuit open")
+        try:
+            data, duration = _hedged_get(params, timeout, deadline)
+        except NutritionPending:
+            raise                                  # kein freier Platz: kein Fehler von OFF selbst
+        except Exception:
+            _count("failures")
+            off_breaker.record_failure()
+            if attempt < OFF_RETRIES:
+                # Full Jitter: zufällig zwischen 0 und Basis * 2^attempt, aber nie über die Deadline hinaus
+                backoff = random.uniform(0, OFF_BACKOFF_S * (2 ** attempt))
+                if deadline is not None and deadline.remaining() - backoff < OFF_MIN_TIMEOUT:
+                    break
+                _count("retries")
+                time.sleep(backoff)
+            continue
+        off_breaker.record_success(duration)
+        with _STATS_LOCK:
+            _latencies.append(duration)
+        return data
+    raise NutritionPending("upstream unavailable")
+
+
+def _count(name: str) -> None:
+    with _STATS_LOCK:
+        _stats[name] += 1
+
+
+def get_off_stats() -> dict:
+    """
+    Kennzahlen für /metrics: Breaker-Zustand, Hedging/Retry-Zähler, Cache-Größe.
+    """
+    with _STATS_LOCK:
+        stats = dict(_stats)
+    return {
+        "breaker": off_breaker.stats(),
+        "hedge_delay_s": _hedge_delay(),
+        **stats,
+        "cache_size": len(_CACHE),
+    }
 
 
 def _normalize_base(label: str) -> str:
@@ -69,10 +260,13 @@ def _query_variants(label: str) -> list[str]:
     return out
 
 
-@lru_cache(maxsize=256)
-def get_nutrition_for_food(query: str) -> dict | None:
+def get_nutrition_for_food(query: str, deadline=None) -> dict | None:
     """
     Fragt OpenFoodFacts nach Nährwerten pro 100 g für einen Suchbegriff.
+    Optional: deadline (admission.Deadline) begrenzt die Gesamtzeit; ist sie
+    abgelaufen, werden keine weiteren Varianten mehr angefragt.
+    Wirft NutritionPending, wenn OFF nicht erreichbar ist (Breaker offen,
+    Fehler nach Retries) oder die Deadline abläuft.
     Rückgabe:
       {
         "query": "<finaler Suchbegriff>",
@@ -87,6 +281,23 @@ def get_nutrition_for_food(query: str) -> dict | None:
       }
     oder None, wenn nichts Brauchbares gefunden wurde.
     """
+    with _CACHE_LOCK:
+        if query in _CACHE:
+            _CACHE.move_to_end(query)
+            return _CACHE[query]
+
+    result = _lookup(query, deadline)           # NutritionPending -> nicht cachen
+    with _CACHE_LOCK:
+        _CACHE[query] = result
+        if len(_CACHE) > _CACHE_MAXSIZE:
+            _CACHE.popitem(last=False)
+    return result
+
+
+def _lookup(query: str, deadline=None) -> dict | None:
+    """
+    Eigentliche OFF-Suche über alle Varianten (ohne Cache).
+    """
     # mehrere neutrale Varianten ausprobieren (z. B. "hotdog" und "hot dog")
     candidates = _query_variants(query)
 
@@ -100,13 +311,8 @@ def get_nutrition_for_food(query: str) -> dict | None:
             "json": 1,                           # JSON‑Antwort
             "fields": "product_name,lang,nutriments,categories_tags"  # nur relevante Felder
         }
-        try:
-            r = requests.get(OFF_SEARCH_URL, params=params, headers=HEADERS, timeout=OFF_TIMEOUT) # alternativ: timeout=8 (sec total)
-            r.raise_for_status()
-            data = r.json()
-        except Exception:
-            # Netzwerk-/Parsing‑Fehler -> nächste Variante testen
-            continue
+        # Netzwerk-/Parsing‑Fehler (nach Retries) oder offener Breaker -> NutritionPending
+        data = _search(params, deadline)
 
         products = (data or {}).get("products", []) or []
         if not products:
@@ -192,9 +398,13 @@ def get_nutrition_for_food(query: str) -> dict | None:
     return None
 
 
-def get_nutrition_bulk(labels: list[str]) -> dict[str, dict | None]:
+def get_nutrition_bulk(labels: list[str], deadline=None,
+                       pending: set[str] | None = None) -> dict[str, dict | None]:
     """
     Batch‑Abfrage für mehrere Labels. Benutzt automatisch den Cache der Einzel‑Funktion.
+    Die optionale deadline gilt für den ganzen Batch (Labels nach Ablauf -> None).
+    Labels, die wegen NutritionPending offen bleiben, werden in 'pending' eingetragen
+    (falls übergeben) und haben im Ergebnis den Wert None.
     Rückgabe: { "<label in lowercase>": {..Nährwerte..} | None }
     """
     out: dict[str, dict | None] = {}
@@ -204,5 +414,10 @@ def get_nutrition_bulk(labels: list[str]) -> dict[str, dict | None]:
         if not key or key in seen:
             continue
         seen.add(key)
-        out[key] = get_nutrition_for_food(key)
+        try:
+            out[key] = get_nutrition_for_food(key, deadline)
+        except NutritionPending:
+            out[key] = None
+            if pending is not None:
+                pending.add(key)
     return out
@@ -0,0 +1,136 @@
+# portion.py
+# ------------------------------------------------------------
+# Portionsschätzung aus Bounding Boxes (optional Segmentierungsmasken) und
+# Nährwert-Summen pro Mahlzeit.
+#
+# Modell (bewusst einfach, vektorisiert mit numpy):
+# - Pro Klasse ein Prior: typische Portion in Gramm (ref_g), die im Bild etwa
+#   den Flächenanteil ref_area einnimmt, plus relative Unsicherheit (rel).
+# - Fläche -> Volumen ~ Fläche^1.5 -> Gramm = ref_g * (anteil / ref_area)^1.5,
+#   begrenzt auf [0.2, 4] * ref_g (Nahaufnahmen/Weitwinkel nicht ausufern lassen).
+# - Bei Masken wird die Maskenfläche statt der Box genutzt (Box überschätzt
+#   runde Objekte) und die Unsicherheit etwas reduziert.
+# - Summen: Gramm / 100 * Nährwerte pro 100 g, fehlende Nährwerte zählen nicht.
+#   Gemeldet wird pro Nährwert, wie vielen Items der Wert fehlt ("missing"),
+#   z. B. Produkte mit kcal, aber ohne Zuckerangabe. Items, deren Abfrage noch
+#   läuft (nutrition_status "loading"), zählen separat als "items_loading".
+#
+# Die Priors sind grobe Richtwerte (keine Kamera-Kalibrierung, kein Tiefenbild);
+# die Konfidenzgrenzen machen diese Unsicherheit sichtbar.
+# ------------------------------------------------------------
+
+import numpy as np
+
+# { "<label lowercase>": (ref_g, ref_area, rel) }
+PORTION_PRIORS: dict[str, tuple[float, float, float]] = {
+    "apple": (180, 0.06, 0.3),       "artichoke": (120, 0.06, 0.4),   "asparagus": (100, 0.08, 0.5),
+    "bagel": (100, 0.07, 0.3),       "banana": (120, 0.07, 0.3),      "beer": (330, 0.08, 0.3),
+    "bell pepper": (160, 0.06, 0.3), "bread": (60, 0.08, 0.5),        "broccoli": (150, 0.10, 0.5),
+    "burrito": (250, 0.10, 0.4),     "cabbage": (300, 0.15, 0.5),     "cake": (120, 0.08, 0.5),
+    "carrot": (70, 0.04, 0.4),       "cheese": (40, 0.05, 0.5),       "coconut": (400, 0.10, 0.4),
+    "coffee": (200, 0.06, 0.3),      "cookie": (20, 0.03, 0.4),       "crab": (300, 0.15, 0.5),
+    "croissant": (60, 0.06, 0.3),    "cucumber": (200, 0.06, 0.4),    "dairy": (150, 0.08, 0.6),
+    "doughnut": (60, 0.05, 0.3),     "drink": (250, 0.07, 0.4),       "egg": (55, 0.03, 0.2),
+    "fast food": (300, 0.15, 0.6),   "fish": (150, 0.10, 0.5),        "fruit": (150, 0.08, 0.6),
+    "grape": (100, 0.06, 0.6),       "grapefruit": (250, 0.07, 0.3),  "hamburger": (220, 0.09, 0.4),
+    "hot dog": (150, 0.07, 0.4),     "ice cream": (100, 0.06, 0.5),   "juice": (250, 0.07, 0.3),
+    "lemon": (80, 0.04, 0.3),        "lobster": (400, 0.15, 0.5),     "mango": (200, 0.06, 0.3),
+    "milk": (250, 0.07, 0.3),        "muffin": (80, 0.05, 0.3),       "orange": (150, 0.05, 0.3),
+    "oyster": (20, 0.02, 0.5),       "pasta": (250, 0.15, 0.5),       "pastry": (80, 0.06, 0.5),
+    "peach": (150, 0.05, 0.3),       "pear": (170, 0.06, 0.3),        "pineapple": (900, 0.12, 0.4),
+    "pizza": (300, 0.20, 0.5),       "pomegranate": (250, 0.06, 0.3), "potato": (170, 0.05, 0.4),
+    "pumpkin": (1500, 0.25, 0.5),    "radish": (15, 0.02, 0.5),       "salad": (150, 0.15, 0.6),
+    "sandwich": (200, 0.10, 0.4),    "seafood": (150, 0.10, 0.6),     "shrimp": (15, 0.02, 0.5),
+    "snack": (50, 0.06, 0.6),        "squid": (150, 0.10, 0.5),       "strawberry": (15, 0.015, 0.4),
+    "sushi": (35, 0.03, 0.4),        "taco": (120, 0.07, 0.4),        "tea": (200, 0.06, 0.3),
+    "tomato": (120, 0.04, 0.3),      "vegetable": (150, 0.10, 0.6),   "watermelon": (300, 0.12, 0.6),
+    "wine": (150, 0.05, 0.3),
+}
+DEFAULT_PRIOR = (150.0, 0.10, 0.6)    # unbekannte Klassen: mittlere Portion, hohe Unsicherheit
+VOLUME_EXPONENT = 1.5                 # Fläche -> Volumen
+CLAMP = (0.2, 4.0)                    # Grenzen relativ zu ref_g
+MASK_REL_FACTOR = 0.8                 # Masken: Unsicherheit * 0.8
+
+# Reihenfolge der Nährwerte in den Summen (Keys aus nutrition_per_100g)
+NUTRIENT_KEYS = ("energy_kcal", "fat_g", "carbs_g", "sugars_g", "protein_g")
+
+
+def estimate_portions(predictions: list[dict], image_size: list[int] | tuple[int, int] | None) -> np.ndarray:
+    """
+    Schätzt Gramm pro Prediction. Rückgabe: Array (N, 3) mit [schätzung, untere, obere] Grenze.
+    Ohne image_size (oder bei ungültiger Größe) werden die Klassen-Priors direkt verwendet.
+    """
+    n = len(predictions)
+    if n == 0:
+        return np.zeros((0, 3))
+
+    priors = np.array([PORTION_PRIORS.get((p.get("label") or "").strip().lower(), DEFAULT_PRIOR)
+                       for p in predictions], dtype=float)
+    ref_g, ref_area, rel = priors[:, 0], priors[:, 1], priors[:, 2]
+
+    if image_size and image_size[0] > 0 and image_size[1] > 0:
+        boxes = np.array([p.get("bbox") or (0, 0, 0, 0) for p in predictions], dtype=float)
+        area = np.clip(boxes[:, 2] - boxes[:, 0], 0, None) * np.clip(boxes[:, 3] - boxes[:, 1], 0, None)
+        mask_area = np.array([p.get("mask_area") or np.nan for p in predictions], dtype=float)
+        has_mask = ~np.isnan(mask_area)
+        area = np.where(has_mask, mask_area, area)
+        rel = np.where(has_mask, rel * MASK_REL_FACTOR, rel)
+        frac = area / float(image_size[0] * image_size[1])
+        grams = ref_g * np.power(frac / ref_area, VOLUME_EXPONENT)
+        grams = np.clip(grams, ref_g * CLAMP[0], ref_g * CLAMP[1])
+        grams = np.where(area > 0, grams, ref_g)           # kaputte Box -> Prior
+    else:
+        grams = ref_g
+
+    return np.stack([grams, grams * (1 - rel), grams * (1 + rel)], axis=1)
+
+
+def meal_totals(grams: np.ndarray, nutrition: list[dict | None],
+                statuses: list[str | None] | None = None) -> dict:
+    """
+    Summiert Nährwerte über alle Items einer Mahlzeit.
+    grams: Array (N, 3) aus estimate_portions, nutrition: pro Item nutrition_per_100g (oder None),
+    statuses: optional pro Item nutrition_status ("loading" -> noch nicht als fehlend zählen).
+    low/high sind die Summen der Einzelgrenzen (konservativ, volle Korrelation angenommen).
+    Rückgabe:
+      {
+        "grams": {"estimate", "low", "high"},
+        "energy_kcal": {"estimate", "low", "high"}, "fat_g": {...}, ...,
+        "missing": {"energy_kcal": int, ...},     # Items ohne diesen Wert (ohne "loading")
+        "items_without_nutrition": int,           # Items ganz ohne Nährwerte (ohne "loading")
+        "items_loading": int                      # Abfrage läuft noch
+      }
+    """
+    per100 = np.array([[(n or {}).get(k) if (n or {}).get(k) is not None else np.nan for k in NUTRIENT_KEYS]
+                       for n in nutrition], dtype=float).reshape(len(nutrition), len(NUTRIENT_KEYS))
+    # (N, 3, 1) * (N, 1, K) -> (N, 3, K); fehlende Werte (NaN) zählen als 0
+    totals = np.nansum(grams[:, :, None] / 100.0 * per100[:, None, :], axis=0)
+    gram_totals = grams.sum(axis=0)
+
+    def bounds(v) -> dict:
+        return {"estimate": round(float(v[0]), 1), "low": round(float(v[1]), 1), "high": round(float(v[2]), 1)}
+
+    loading = np.array([s == "loading" for s in (statuses or [None] * len(nutrition))], dtype=bool)
+    missing = np.isnan(per100) & ~loading[:, None]
+
+    out = {"grams": bounds(gram_totals)}
+    for k, key in enumerate(NUTRIENT_KEYS):
+        out[key] = bounds(totals[:, k])
+    out["missing"] = {key: int(missing[:, k].sum()) for k, key in enumerate(NUTRIENT_KEYS)}
+    out["items_without_nutrition"] = int(sum(1 for n, l in zip(nutrition, loading) if not n and not l))
+    out["items_loading"] = int(loading.sum())
+    return out
+
+
+def add_portions(items: list[dict], image_size) -> tuple[list[dict], dict]:
+    """
+    Hängt "portion_g" an jedes Item und berechnet die Mahlzeit-Summen.
+    Erwartet Items mit "label", "bbox", "nutrition_per_100g" und optional "nutrition_status" (wie in /predict).
+    """
+    grams = estimate_portions(items, image_size)
+    out = []
+    for item, (g, lo, hi) in zip(items, grams):
+        out.append({**item, "portion_g": {"estimate": round(float(g), 1),
+                                          "low": round(float(lo), 1), "high": round(float(hi), 1)}})
+    return out, meal_totals(grams, [it.get("nutrition_per_100g") for it in items],
+                            [it.get("nutrition_status") for it in items])
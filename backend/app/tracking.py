@@ -0,0 +1,142 @@
+# tracking.py
+# ------------------------------------------------------------
+# Einfacher Objekt-Tracker für die Video-Analyse (video_predict.py):
+# zählt eindeutige Objekte über gesampelte Frames statt Duplikate pro Frame.
+#
+# - Zuordnung pro Label, greedy nach Konfidenz: bevorzugt über IoU, bei
+#   Kameraschwenks (Box verschiebt sich stark zwischen zwei Samples) über den
+#   Abstand der Box-Mittelpunkte relativ zur Boxgröße.
+# - Tracks mit weniger als min_hits Treffern gelten als Ausreißer.
+# - Untergrenze pro Label: maximale Anzahl Detections in einem einzelnen Frame
+#   (sofern das Label in mindestens min_hits Frames vorkam) -> ein Objekt
+#   verschwindet nicht, nur weil das Tracking abreißt.
+# Reines Python, keine Abhängigkeit zu OpenCV/YOLO.
+# ------------------------------------------------------------
+
+TRACK_IOU = 0.3                 # Mindest-IoU, um eine Detection einem Track zuzuordnen
+TRACK_CENTER_DIST = 1.0         # alternativ: Mittelpunktabstand <= 1.0 * größte Boxkante
+TRACK_MAX_AGE = 3               # so viele gesampelte Frames ohne Treffer -> Track beendet
+TRACK_MIN_HITS = 2              # so oft gesehen -> zählt als echtes Objekt (filtert Ausreißer)
+
+
+def _iou(a: list[float], b: list[float]) -> float:
+    ix1, iy1 = max(a[0], b[0]), max(a[1], b[1])
+    ix2, iy2 = min(a[2], b[2]), min(a[3], b[3])
+    inter = max(0.0, ix2 - ix1) * max(0.0, iy2 - iy1)
+    if inter <= 0:
+        return 0.0
+    area_a = (a[2] - a[0]) * (a[3] - a[1])
+    area_b = (b[2] - b[0]) * (b[3] - b[1])
+    return inter / (area_a + area_b - inter)
+
+
+def _center_dist(a: list[float], b: list[float]) -> float:
+    """
+    Abstand der Mittelpunkte, normiert auf die größte Kante beider Boxen.
+    """
+    dx = (a[0] + a[2]) / 2 - (b[0] + b[2]) / 2
+    dy = (a[1] + a[3]) / 2 - (b[1] + b[3]) / 2
+    size = max(a[2] - a[0], a[3] - a[1], b[2] - b[0], b[3] - b[1], 1e-6)
+    return (dx * dx + dy * dy) ** 0.5 / size
+
+
+class IouTracker:
+    """
+    Greedy-Tracker: Detections eines Frames werden dem passendsten Track gleichen
+    Labels zugeordnet (höchste IoU, sonst nächster Mittelpunkt), sonst entsteht
+    ein neuer Track. Beendete Tracks werden in 'summary' zusammengefasst und verworfen.
+    """
+    def __init__(self, iou_threshold: float = TRACK_IOU, center_dist: float = TRACK_CENTER_DIST,
+                 max_age: int = TRACK_MAX_AGE, min_hits: int = TRACK_MIN_HITS):
+        self.iou_threshold = iou_threshold
+        self.center_dist = center_dist
+        self.max_age = max_age
+        self.min_hits = min_hits
+        self.tracks: list[dict] = []                 # aktive Tracks
+        self.summary: dict[str, dict] = {}           # { label: {count, max_confidence, first_seen_s, class_id} }
+        self.per_label: dict[str, dict] = {}         # { label: {frames, max_per_frame, ...} } für die Untergrenze
+
+    def _match_score(self, t: dict, p: dict) -> tuple[float, float] | None:
+        iou = _iou(t["bbox"], p["bbox"])
+        dist = _center_dist(t["bbox"], p["bbox"])
+        if iou < self.iou_threshold and dist > self.center_dist:
+            return None
+        return (iou, -dist)                          # IoU zuerst, dann Nähe
+
+    def update(self, predictions: list[dict], t_s: float) -> None:
+        self._update_label_stats(predictions, t_s)
+
+        unmatched = list(range(len(self.tracks)))
+        # Detections nach Konfidenz absteigend zuordnen (sichere zuerst)
+        for p in sorted(predictions, key=lambda p: p.get("confidence", 0.0), reverse=True):
+            best, best_score = None, None
+            for i in unmatched:
+                t = self.tracks[i]
+                if t["label"] != p["label"]:
+                    continue
+                score = self._match_score(t, p)
+                if score is not None and (best_score is None or score > best_score):
+                    best, best_score = i, score
+            if best is None:
+                self.tracks.append({"label": p["label"], "class_id": p.get("class_id"), "bbox": p["bbox"],
+                                    "hits": 1, "age": 0, "max_confidence": p.get("confidence", 0.0),
+                                    "first_seen_s": t_s})
+                continue
+            unmatched.remove(best)
+            t = self.tracks[best]
+            t.update(bbox=p["bbox"], age=0, hits=t["hits"] + 1,
+                     max_confidence=max(t["max_confidence"], p.get("confidence", 0.0)))
+
+        # nicht getroffene Tracks altern; zu alte werden abgeschlossen
+        for i in unmatched:
+            self.tracks[i]["age"] += 1
+        alive = []
+        for t in self.tracks:
+            if t["age"] > self.max_age:
+                self._finish(t)
+            else:
+                alive.append(t)
+        self.tracks = alive
+
+    def _update_label_stats(self, predictions: list[dict], t_s: float) -> None:
+        counts: dict[str, int] = {}
+        for p in predictions:
+            counts[p["label"]] = counts.get(p["label"], 0) + 1
+            s = self.per_label.setdefault(p["label"], {"class_id": p.get("class_id"), "frames": 0,
+                                                       "max_per_frame": 0, "max_confidence": 0.0,
+                                                       "first_seen_s": t_s})
+            s["max_confidence"] = max(s["max_confidence"], p.get("confidence", 0.0))
+        for label, n in counts.items():
+            s = self.per_label[label]
+            s["frames"] += 1
+            s["max_per_frame"] = max(s["max_per_frame"], n)
+
+    def _finish(self, t: dict) -> None:
+        if t["hits"] < self.min_hits:
+            return
+        s = self.summary.setdefault(t["label"], {"class_id": t["class_id"], "count": 0,
+                                                 "max_confidence": 0.0, "first_seen_s": t["first_seen_s"]})
+        s["count"] += 1
+        s["max_confidence"] = max(s["max_confidence"], t["max_confidence"])
+        s["first_seen_s"] = min(s["first_seen_s"], t["first_seen_s"])
+
+    def finish(self, frames_seen: int | None = None) -> dict[str, dict]:
+        """
+        Schließt alle aktiven Tracks ab und liefert die Zusammenfassung pro Label.
+        frames_seen < min_hits (sehr kurzer Clip): jede Detection zählt.
+        """
+        if frames_seen is not None and frames_seen < self.min_hits:
+            self.min_hits = 1
+        for t in self.tracks:
+            self._finish(t)
+        self.tracks = []
+
+        # Untergrenze: so viele Objekte waren mindestens gleichzeitig im Bild
+        for label, st in self.per_label.items():
+            if st["frames"] < self.min_hits:
+                continue                             # nur in einem Frame gesehen -> Ausreißer
+            s = self.summary.setdefault(label, {"class_id": st["class_id"], "count": 0,
+                                                "max_confidence": st["max_confidence"],
+                                                "first_seen_s": st["first_seen_s"]})
+            s["count"] = max(s["count"], st["max_per_frame"])
+        return self.summary
@@ -0,0 +1,117 @@
+# video_predict.py
+# ------------------------------------------------------------
+# Video-/Burst-Analyse für kurze Clips (z. B. Kameraschwenk über einen Tisch):
+# - Frames werden streamend mit OpenCV dekodiert (nie das ganze Video im Speicher).
+# - Sampling: feste Rate (fps) ODER Szenenwechsel (Differenz kleiner Graustufen-
+#   Thumbnails zum zuletzt gesampelten Frame).
+# - Gesampelte Frames werden in kleinen Batches durch das bestehende YOLO-Modell
+#   (yolo_predict.run_inference_batch) geschickt. Über 'infer' kann der Aufrufer
+#   jeden Batch einzeln einplanen (main.py: ein Admission-Slot pro Batch).
+# - Einfacher Tracker pro Label (tracking.py) zählt eindeutige Objekte statt
+#   Duplikate pro Frame.
+#
+# Speicher: höchstens ein Batch Frames + aktive Tracks; beendete Tracks werden
+# nur noch als Zähler geführt -> unabhängig von der Clip-Länge begrenzt.
+# ------------------------------------------------------------
+
+import cv2                                       # Video-Dekodierung (kommt mit ultralytics)
+from yolo_predict import run_inference_batch
+from tracking import IouTracker                  # eindeutige Objekte über Frames zählen
+
+DEFAULT_SAMPLE_FPS = 2.0        # gesampelte Frames pro Sekunde Video
+DEFAULT_BATCH_SIZE = 8          # Frames pro Modellaufruf
+MAX_SAMPLED_FRAMES = 240        # harte Obergrenze (z. B. 2 min bei 2 fps)
+SCENE_THUMB_SIZE = (64, 36)     # Thumbnail für Szenenwechsel-Erkennung
+
+
+def sample_frames(path: str, fps: float | None = DEFAULT_SAMPLE_FPS, scene_threshold: float | None = None,
+                  max_frames: int = MAX_SAMPLED_FRAMES):
+    """
+    Generator über gesampelte Frames: (frame_index, zeit_s, frame_bgr).
+    - fps: feste Sampling-Rate (nicht gesampelte Frames werden per grab()
+      übersprungen; retrieve() inkl. BGR-Konvertierung nur für gesampelte Frames.
+      Je nach Backend, z. B. FFmpeg, dekodiert grab() den Frame trotzdem).
+    - scene_threshold: stattdessen Szenenwechsel (mittlere absolute Differenz der
+      Graustufen-Thumbnails, 0..255) zum zuletzt gesampelten Frame.
+    """
+    cap = cv2.VideoCapture(path)
+    if not cap.isOpened():
+        raise ValueError("video could not be decoded")
+    try:
+        src_fps = cap.get(cv2.CAP_PROP_FPS) or 25.0          # manche Container liefern 0 -> Fallback
+        step = max(1, round(src_fps / fps)) if fps else 1
+        last_thumb = None
+        sampled = 0
+        idx = -1
+        while sampled < max_frames:
+            if not cap.grab():                               # nächsten Frame holen (FFmpeg dekodiert hier bereits)
+                break
+            idx += 1
+            if scene_threshold is None and idx % step != 0:
+                continue
+            ok, frame = cap.retrieve()                       # Frame als BGR-Bild abholen
+            if not ok:
+                continue
+            if scene_threshold is not None:
+                thumb = cv2.resize(cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY), SCENE_THUMB_SIZE,
+                                   interpolation=cv2.INTER_AREA)
+                if last_thumb is not None and cv2.absdiff(thumb, last_thumb).mean() < scene_threshold:
+                    continue
+                last_thumb = thumb
+            sampled += 1
+            yield idx, idx / src_fps, frame
+    finally:
+        cap.release()
+
+
+def analyze_video(path: str, fps: float | None = DEFAULT_SAMPLE_FPS, scene_threshold: float | None = None,
+                  batch_size: int = DEFAULT_BATCH_SIZE, deadline=None, infer=None) -> dict:
+    """
+    Dekodiert, sampelt und analysiert ein Video. Läuft die Deadline ab, wird
+    mit den bis dahin analysierten Frames abgebrochen ("truncated": True).
+    infer: optional Funktion frames -> Predictions pro Frame (Default:
+    run_inference_batch mit der Deadline); TimeoutError daraus = Abbruch.
+    Rückgabe:
+      {
+        "items": [ {"label", "class_id", "count", "max_confidence", "first_seen_s"}, ... ],
+        "frames_sampled": int,
+        "last_frame_s": float,
+        "truncated": bool
+      }
+    """
+    infer = infer or (lambda frames: run_inference_batch(frames, deadline))
+    tracker = IouTracker()
+    batch: list = []
+    times: list[float] = []
+    frames_sampled = 0
+    last_t = 0.0
+    truncated = False
+
+    def flush():
+        # Zähler erst nach erfolgreicher Inferenz erhöhen (bei Timeout nicht mitzählen)
+        nonlocal frames_sampled, last_t
+        if not batch:
+            return
+        for preds, t_s in zip(infer(batch), times):
+            tracker.update(preds, t_s)
+            frames_sampled += 1
+            last_t = t_s
+        batch.clear()
+        times.clear()
+
+    try:
+        for _, t_s, frame in sample_frames(path, fps, scene_threshold):
+            batch.append(frame)
+            times.append(t_s)
+            if len(batch) >= batch_size:
+                flush()
+        flush()
+    except TimeoutError:
+        truncated = True                                     # Deadline abgelaufen -> Teilergebnis
+
+    summary = tracker.finish(frames_seen=frames_sampled)
+    items = [{"label": label, **s, "max_confidence": round(s["max_confidence"], 3),
+              "first_seen_s": round(s["first_seen_s"], 2)}
+             for label, s in sorted(summary.items(), key=lambda kv: kv[1]["first_seen_s"])]
+    return {"items": items, "frames_sampled": frames_sampled,
+            "last_frame_s": round(last_t, 2), "truncated": truncated}
@@ -9,10 +9,13 @@
 #         "label": str,           # Klassenname aus model.names (englisch)
 #         "confidence": float,    # 0..1
 #         "bbox": [x1, y1, x2, y2]# optional fürs Frontend (Pixelkoordinaten)
+#         "mask_area": float      # nur bei Segmentierungsmodellen (Pixel im Originalbild)
 #      }, ...
-#   ]
+#   ],
+#   "image_size": [breite, hoehe]  # für Portionsschätzung (Flächenanteil der Box)
 # }
 # Dazu: get_model_name() für das Frontend (Anzeige im Header).
+#       run_inference_batch() für mehrere Frames auf einmal (Video-Endpoint).
 # ------------------------------------------------------------
 
 from ultralytics import YOLO          # Ultralytics YOLO Inferenz
@@ -43,11 +46,17 @@ def resolve_weights(spec: str) -> str:
 
 model = YOLO(resolve_weights(MODELL))       # lädt Gewichte und bereitet Inferenz vor
 
-def run_inference(image_bytes: bytes) -> dict:
+def run_inference(image_bytes: bytes, deadline=None) -> dict:
     """
     Führt YOLO-Inferenz auf einem Bild (als Bytes) aus und
     liefert ein Dict mit 'predictions' (Liste von Erkennungen).
+    Optional: deadline (admission.Deadline). Ist sie vor dem Start bereits
+    abgelaufen, wird TimeoutError geworfen, statt CPU für ein Ergebnis zu
+    verbrauchen, das niemand mehr abholt.
     """
+    if deadline is not None and deadline.expired():
+        raise TimeoutError("deadline expired before inference")
+
     # Bytes -> PIL Image (PIL erwartet einen Datei-ähnlichen Stream)
     image = Image.open(io.BytesIO(image_bytes))
 
@@ -57,26 +66,60 @@ def run_inference(image_bytes: bytes) -> dict:
     # Vorhersagen extrahieren (pro Result-Frame die Boxes)
     predictions = []
     for r in results:
-        # r.boxes enthält alle Detektionen; jede Box hat Koordinaten & Meta
-        for box in r.boxes:
-            class_id = int(box.cls)                 # Klassenindex (z. B. 0..N)
-            confidence = float(box.conf)            # Konfidenz 0..1
-            label = model.names[class_id]           # Klassenname (englisch)
-
-            # Bounding Box als Liste [x1, y1, x2, y2] (Float -> round für saubere Ausgabe)
-            # .xyxy gibt Tensor mit [x1, y1, x2, y2]; wir holen das erste Element (.tolist()[0])
-            x1, y1, x2, y2 = box.xyxy[0].tolist()
-            bbox = [round(x1, 1), round(y1, 1), round(x2, 1), round(y2, 1)]
-
-            predictions.append({
-                "class_id": class_id,
-                "label": label,
-                "confidence": round(confidence, 3),
-                "bbox": bbox
-            })
+        predictions.extend(_extract_predictions(r))
 
     # Einheitliches Rückgabeformat, das das Backend / Frontend leicht weiterverarbeiten kann
-    return {"predictions": predictions}
+    return {"predictions": predictions, "image_size": list(image.size)}
+
+
+def run_inference_batch(frames: list, deadline=None) -> list[list[dict]]:
+    """
+    Batch-Inferenz für mehrere Frames (numpy-Arrays BGR, wie von cv2 geliefert,
+    oder PIL-Images). Ein Modellaufruf für den ganzen Batch.
+    Rückgabe: pro Frame eine Liste von Predictions (gleiches Format wie run_inference).
+    """
+    if deadline is not None and deadline.expired():
+        raise TimeoutError("deadline expired before inference")
+    if not frames:
+        return []
+    results = model(frames, verbose=False)
+    return [_extract_predictions(r) for r in results]
+
+
+def _extract_predictions(r) -> list[dict]:
+    """
+    Wandelt ein Ultralytics-Result (ein Frame) in die Prediction-Dicts um.
+    """
+    predictions = []
+    # Segmentierungsmodelle: Maskenfläche pro Detection (Anteil der Maske * Originalfläche)
+    mask_areas = None
+    if getattr(r, "masks", None) is not None:
+        h, w = r.orig_shape
+        m = r.masks.data
+        mask_areas = (m.sum(dim=(1, 2)) / (m.shape[1] * m.shape[2]) * (w * h)).tolist()
+
+    # r.boxes enthält alle Detektionen; jede Box hat Koordinaten & Meta
+    for i, box in enumerate(r.boxes):
+        class_id = int(box.cls)                 # Klassenindex (z. B. 0..N)
+        confidence = float(box.conf)            # Konfidenz 0..1
+        label = model.names[class_id]           # Klassenname (englisch)
+
+        # Bounding Box als Liste [x1, y1, x2, y2] (Float -> round für saubere Ausgabe)
+        # .xyxy gibt Tensor mit [x1, y1, x2, y2]; wir holen das erste Element (.tolist()[0])
+        x1, y1, x2, y2 = box.xyxy[0].tolist()
+        bbox = [round(x1, 1), round(y1, 1), round(x2, 1), round(y2, 1)]
+
+        pred = {
+            "class_id": class_id,
+            "label": label,
+            "confidence": round(confidence, 3),
+            "bbox": bbox
+        }
+        if mask_areas is not None:
+            pred["mask_area"] = round(mask_areas[i], 1)
+        predictions.append(pred)
+
+    return predictions
 
 
 def get_model_name() -> str:
@@ -0,0 +1,5 @@
+# Backend-Module liegen flach in backend/app (Import wie in main.py: "from admission import ...")
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "app"))
@@ -0,0 +1,108 @@
+import asyncio
+
+import pytest
+
+from admission import AdmissionController, Deadline, RateLimiter, Rejected
+
+
+async def _burst(controller: AdmissionController, n: int, hold_s: float = 0.05) -> list:
+    outcomes = []
+
+    async def job():
+        try:
+            async with controller.slot(Deadline(5.0)):
+                await asyncio.sleep(hold_s)
+            outcomes.append("ok")
+        except Rejected as e:
+            outcomes.append(e.status_code)
+
+    await asyncio.gather(*(job() for _ in range(n)))
+    return outcomes
+
+
+def test_concurrent_burst_respects_queue_bound():
+    controller = AdmissionController(max_inflight=1, max_queue=0, initial_service_s=0.01)
+    outcomes = asyncio.run(_burst(controller, 8))
+    assert outcomes.count("ok") == 1
+    assert outcomes.count(503) == 7
+
+
+def test_concurrent_burst_admits_inflight_plus_queue():
+    controller = AdmissionController(max_inflight=2, max_queue=3, initial_service_s=0.01)
+    outcomes = asyncio.run(_burst(controller, 10))
+    assert outcomes.count("ok") == 5
+    assert controller.inflight == 0 and controller.queued == 0
+
+
+def test_rejects_when_estimated_wait_exceeds_deadline():
+    controller = AdmissionController(max_inflight=1, max_queue=10, initial_service_s=2.0)
+
+    async def run():
+        async def long_job():
+            async with controller.slot(Deadline(10.0)):
+                await asyncio.sleep(0.1)
+
+        task = asyncio.create_task(long_job())
+        await asyncio.sleep(0)                       # long_job belegt den Slot
+        with pytest.raises(Rejected) as exc:
+            async with controller.slot(Deadline(1.0)):
+                pass
+        await task
+        return exc.value
+
+    err = asyncio.run(run())
+    assert err.status_code == 503
+    assert err.retry_after >= 1
+
+
+def test_rate_limiter_returns_429_after_burst():
+    limiter = RateLimiter(rate=1.0, burst=2.0)
+    limiter.check("1.2.3.4")
+    limiter.check("1.2.3.4")
+    with pytest.raises(Rejected) as exc:
+        limiter.check("1.2.3.4")
+    assert exc.value.status_code == 429
+    limiter.check("5.6.7.8")                         # anderer Client hat eigenes Kontingent
+
+
+def test_image_runs_between_video_batches():
+    controller = AdmissionController(max_inflight=1, max_queue=8, initial_service_s=0.5, initial_batch_s=2.0)
+    order = []
+
+    async def run():
+        async def video():
+            for i in range(3):                       # ein Slot pro Batch, nicht für das ganze Video
+                async with controller.slot(Deadline(60.0), video=True):
+                    order.append(f"batch{i}")
+                    await asyncio.sleep(0.02)
+                await asyncio.sleep(0)
+
+        task = asyncio.create_task(video())
+        await asyncio.sleep(0.01)                    # erster Batch belegt den Slot
+        assert controller.estimated_wait() == pytest.approx(2.0)   # Batch-EWMA, nicht die Video-Deadline
+        async with controller.slot(Deadline(15.0)):
+            order.append("image")
+        await task
+
+    asyncio.run(run())
+    assert order.index("image") < order.index("batch2")
+    assert controller.batches == 0 and controller.estimated_wait() == 0.0
+    assert controller.batch_service_s < 2.0 and controller.service_s < 0.5
+
+
+def test_only_completed_requests_update_service_estimate():
+    controller = AdmissionController(max_inflight=1, max_queue=0, initial_service_s=2.0)
+
+    async def run():
+        with pytest.raises(TimeoutError):
+            async with controller.slot(Deadline(5.0)):
+                raise TimeoutError                   # z. B. Deadline vor der Inferenz abgelaufen
+        async with controller.slot(Deadline(5.0)) as ticket:
+            ticket.skip()                            # Client weg (499)
+        assert controller.service_s == 2.0
+        async with controller.slot(Deadline(5.0)):
+            pass                                     # normales Ende -> wird gemessen
+        assert controller.service_s < 2.0
+
+    asyncio.run(run())
+    assert controller.inflight == 0
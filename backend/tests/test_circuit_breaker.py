@@ -0,0 +1,34 @@
+import time
+
+from circuit_breaker import CircuitBreaker, CLOSED, HALF_OPEN, OPEN
+
+
+def test_opens_after_failure_rate_and_short_circuits():
+    breaker = CircuitBreaker(window=10, min_calls=4, failure_rate=0.5, open_s=30.0)
+    for _ in range(4):
+        assert breaker.allow()
+        breaker.record_failure()
+    assert breaker.state == OPEN
+    assert not breaker.allow()
+    assert breaker.stats()["short_circuited"] == 1
+
+
+def test_half_open_allows_single_probe_and_closes_on_success():
+    breaker = CircuitBreaker(window=10, min_calls=2, failure_rate=0.5, open_s=0.01)
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    time.sleep(0.02)
+    assert breaker.allow()                           # Probe
+    assert breaker.state == HALF_OPEN
+    assert not breaker.allow()                       # zweite Anfrage wartet auf die Probe
+    breaker.record_success(0.1)
+    assert breaker.state == CLOSED
+    assert breaker.allow()
+
+
+def test_opens_on_slow_calls():
+    breaker = CircuitBreaker(window=10, min_calls=3, slow_call_s=1.0, slow_rate=0.8)
+    for _ in range(3):
+        breaker.record_success(2.0)
+    assert breaker.state == OPEN
@@ -0,0 +1,192 @@
+import asyncio
+import json
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("numpy")
+
+import enrichment
+from admission import Deadline
+from circuit_breaker import CircuitBreaker
+from enrichment import ResultStore, retry_pending, snapshot, start_enrichment
+
+APPLE = {"energy_kcal": 52, "fat_g": 0.2, "carbs_g": 14, "sugars_g": 10, "protein_g": 0.3}
+
+
+def _pred(label):
+    return {"label": label, "class_id": 0, "confidence": 0.9, "bbox": [0, 0, 100, 100]}
+
+
+@pytest.fixture
+def off(monkeypatch):
+    # OFF-Stub für enrichment: { label: nutrition | None }, Labels in 'down' -> pending
+    state = {"data": {"apple": APPLE}, "down": set(), "calls": []}
+
+    def fake_bulk(labels, deadline=None, pending=None):
+        state["calls"].append(list(labels))
+        out = {}
+        for lbl in labels:
+            out[lbl] = None if lbl in state["down"] else state["data"].get(lbl)
+            if lbl in state["down"] and pending is not None:
+                pending.add(lbl)
+        return out
+
+    monkeypatch.setattr(enrichment, "get_nutrition_bulk", fake_bulk)
+    monkeypatch.setattr(enrichment, "off_breaker", CircuitBreaker(min_calls=1, open_s=30.0))
+    monkeypatch.setattr(enrichment, "_lookups", asyncio.Semaphore(enrichment.MAX_LOOKUPS))
+    return state
+
+
+def test_pending_label_is_retried_on_poll(off):
+    store = ResultStore(ttl_s=60, max_entries=10)
+    entry = store.create("img", [_pred("apple")], {"sha256": "x", "storage": "temp"}, [1000, 1000])
+    entry["status"]["apple"] = "pending"                 # z. B. Breaker war beim /predict offen
+    entry["done"] = True
+
+    async def run():
+        assert not retry_pending(entry, Deadline(5.0))   # gerade erst versucht -> noch nicht erneut
+        entry["retried"] -= enrichment.RETRY_PENDING_S
+        assert retry_pending(entry, Deadline(5.0))
+        assert snapshot(entry)["items"][0]["nutrition_status"] == "loading"
+        await entry["task"]
+
+    asyncio.run(run())
+    final = snapshot(entry)
+    assert final["done"] and not final["degraded"]
+    assert final["items"][0]["nutrition_status"] == "ok"
+    assert final["items"][0]["nutrition_per_100g"] == APPLE
+    assert off["calls"] == [["apple"]]
+
+
+def test_no_retry_while_breaker_open(off):
+    store = ResultStore(ttl_s=60, max_entries=10)
+    entry = store.create("img", [_pred("apple")], {}, None)
+    entry["status"]["apple"] = "pending"
+    entry["done"] = True
+    entry["retried"] -= enrichment.RETRY_PENDING_S
+    enrichment.off_breaker.record_failure()              # min_calls=1 -> offen
+
+    assert not retry_pending(entry, Deadline(5.0))
+    assert entry["status"]["apple"] == "pending" and off["calls"] == []
+
+
+def test_lookups_are_limited_across_requests(off, monkeypatch):
+    active, peak = [0], [0]
+    lock = threading.Lock()
+
+    def slow_bulk(labels, deadline=None, pending=None):
+        with lock:
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+        time.sleep(0.05)
+        with lock:
+            active[0] -= 1
+        return {lbl: APPLE for lbl in labels}
+
+    monkeypatch.setattr(enrichment, "get_nutrition_bulk", slow_bulk)
+    store = ResultStore(ttl_s=60, max_entries=50)
+
+    async def run():
+        entries = [store.create(f"img{i}", [_pred(f"food{i}-{j}") for j in range(3)], {}, None)
+                   for i in range(6)]
+        for entry in entries:
+            start_enrichment(entry, Deadline(5.0))
+        await asyncio.gather(*(entry["task"] for entry in entries))
+        return entries
+
+    entries = asyncio.run(run())
+    assert peak[0] == enrichment.MAX_LOOKUPS
+    assert all(snapshot(e)["done"] and not snapshot(e)["degraded"] for e in entries)
+
+
+def test_lookup_without_free_slot_before_deadline_is_pending(off, monkeypatch):
+    async def run():
+        for _ in range(enrichment.MAX_LOOKUPS):
+            await enrichment._lookups.acquire()          # alle Plätze belegt
+        pending: set[str] = set()
+        out = await enrichment.lookup_bulk(["Apple", ""], Deadline(0.05), pending)
+        return out, pending
+
+    out, pending = asyncio.run(run())
+    assert out == {"apple": None} and pending == {"apple"}
+    assert off["calls"] == []
+
+
+def test_store_evicts_by_size_and_ttl(monkeypatch):
+    store = ResultStore(ttl_s=60, max_entries=2)
+    for i in range(3):
+        store.create(f"img{i}", [], {}, None)
+    assert store.get("img0") is None                     # älteste fliegt bei Überschreitung raus
+    assert store.get("img1") is not None and store.get("img2") is not None
+
+    now = time.monotonic()
+    monkeypatch.setattr(enrichment.time, "monotonic", lambda: now + 61)
+    assert store.get("img1") is None and store.get("img2") is None
+
+
+def test_snapshot_schema():
+    store = ResultStore(ttl_s=60, max_entries=10)
+    entry = store.create("img", [_pred("Apple"), _pred("cake")], {"sha256": "abc", "storage": "temp"}, [1000, 1000])
+    entry["nutrition"]["apple"] = APPLE
+    entry["status"]["apple"] = "ok"
+
+    snap = snapshot(entry)
+    assert set(snap) == {"items", "image_id", "sha256", "storage", "done", "degraded", "meal_totals"}
+    assert [it["nutrition_status"] for it in snap["items"]] == ["ok", "loading"]
+    assert snap["items"][0]["nutrition_per_100g"] == APPLE and "portion_g" in snap["items"][0]
+    assert snap["meal_totals"]["items_loading"] == 1 and not snap["done"]
+
+
+def _collect(entry, mode):
+    async def run():
+        queue = start_enrichment(entry, Deadline(5.0))
+        return [chunk async for chunk in enrichment.stream_events(entry, queue, mode)]
+
+    return asyncio.run(run())
+
+
+def test_ndjson_event_order_and_final_snapshot(off):
+    off["down"].add("cake")
+    store = ResultStore(ttl_s=60, max_entries=10)
+    entry = store.create("img", [_pred("apple"), _pred("cake"), _pred("pear")], {"sha256": "abc", "storage": "temp"},
+                         [1000, 1000])
+
+    chunks = _collect(entry, "ndjson")
+    assert all(c.endswith("\n") and c.count("\n") == 1 for c in chunks)
+    events = [json.loads(c) for c in chunks]
+
+    assert [e["type"] for e in events] == ["detections", "nutrition", "nutrition", "nutrition", "done"]
+    assert {it["nutrition_status"] for it in events[0]["items"]} == {"loading"}
+    statuses = {e["label"]: e["nutrition_status"] for e in events[1:4]}
+    assert statuses == {"apple": "ok", "cake": "pending", "pear": "not_found"}
+    assert events[-1]["image_id"] == "img" and events[-1]["degraded"] is True
+
+    final = snapshot(entry)
+    assert final["done"] and final["degraded"]
+    assert final["meal_totals"] == events[-1]["meal_totals"]
+    assert final["meal_totals"]["items_loading"] == 0
+
+
+def test_sse_framing(off):
+    store = ResultStore(ttl_s=60, max_entries=10)
+    entry = store.create("img", [_pred("apple")], {}, None)
+
+    chunks = _collect(entry, "sse")
+    assert [c.split("\n", 1)[0] for c in chunks] == ["event: detections", "event: nutrition", "event: done"]
+    for c in chunks:
+        assert c.endswith("\n\n")
+        event_line, data_line = c.rstrip("\n").split("\n")
+        assert json.loads(data_line.removeprefix("data: "))["type"] == event_line.removeprefix("event: ")
+
+
+def test_get_unknown_image_id_returns_404():
+    pytest.importorskip("ultralytics")                   # main lädt das YOLO-Modell
+    from fastapi.testclient import TestClient
+    import main
+
+    response = TestClient(main.app).get("/predict/does-not-exist")
+    assert response.status_code == 404
+    assert response.json()["status"] == "error"
@@ -0,0 +1,117 @@
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("requests")
+
+import openfoodfacts_client as off
+from admission import Deadline
+from circuit_breaker import CircuitBreaker, OPEN
+
+PARAMS = {"search_terms": "apple"}
+
+
+class _Response:
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return {"products": [{"nutriments": {"energy-kcal_100g": 52}}]}
+
+
+@pytest.fixture(autouse=True)
+def fresh_state(monkeypatch):
+    # jeder Test mit eigenem Breaker, leeren Latenzen/Zählern und leerem Cache
+    monkeypatch.setattr(off, "off_breaker", CircuitBreaker(window=20, min_calls=5, open_s=30.0))
+    monkeypatch.setattr(off, "_stats", {k: 0 for k in off._stats})
+    off._latencies.clear()
+    off._CACHE.clear()
+    yield
+    off._latencies.clear()
+    off._CACHE.clear()
+
+
+def _stub_get(monkeypatch, behaviour):
+    # behaviour(call_nr) -> Response oder Exception; Aufrufe werden mitgezählt
+    calls = []
+    lock = threading.Lock()
+
+    def fake_get(*args, **kwargs):
+        with lock:
+            calls.append(time.perf_counter())
+            n = len(calls)
+        result = behaviour(n)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    monkeypatch.setattr(off.requests, "get", fake_get)
+    return calls
+
+
+def test_retries_once_then_pending(monkeypatch):
+    calls = _stub_get(monkeypatch, lambda n: ConnectionError("down"))
+    monkeypatch.setattr(off.time, "sleep", lambda s: None)
+    with pytest.raises(off.NutritionPending):
+        off._search(PARAMS, Deadline(5.0))
+    assert len(calls) == off.OFF_RETRIES + 1
+    assert off._stats["retries"] == off.OFF_RETRIES
+    assert off._stats["failures"] == off.OFF_RETRIES + 1
+
+
+def test_backoff_is_jittered_and_stops_at_deadline(monkeypatch):
+    calls = _stub_get(monkeypatch, lambda n: ConnectionError("down"))
+    jitter = []
+    monkeypatch.setattr(off.random, "uniform", lambda a, b: jitter.append((a, b)) or b)
+
+    with pytest.raises(off.NutritionPending):
+        off._search(PARAMS, Deadline(0.3))          # 0.3 s - Backoff 0.25 s < OFF_MIN_TIMEOUT
+    assert jitter == [(0, off.OFF_BACKOFF_S)]
+    assert len(calls) == 1                           # kein Retry mehr, kein Schlafen über die Deadline
+    assert off._stats["retries"] == 0
+
+
+def test_hedge_fires_after_delay_and_wins(monkeypatch):
+    off._latencies.extend([0.05] * off.HEDGE_MIN_SAMPLES)
+    assert off._hedge_delay() == off.HEDGE_MIN_DELAY_S
+
+    def behaviour(n):
+        if n == 1:
+            time.sleep(1.0)                          # erste Anfrage hängt
+        return _Response()
+
+    calls = _stub_get(monkeypatch, behaviour)
+    t0 = time.perf_counter()
+    data = off._search(PARAMS, Deadline(5.0))
+    elapsed = time.perf_counter() - t0
+
+    assert data["products"]
+    assert len(calls) == 2
+    assert calls[1] - calls[0] == pytest.approx(off.HEDGE_MIN_DELAY_S, abs=0.15)
+    assert elapsed < 0.8
+    assert off._stats["hedged"] == 1 and off._stats["hedge_wins"] == 1
+
+
+def test_wait_is_bounded_by_deadline(monkeypatch):
+    _stub_get(monkeypatch, lambda n: time.sleep(1.0) or _Response())
+    t0 = time.perf_counter()
+    with pytest.raises(off.NutritionPending):
+        off._search(PARAMS, Deadline(0.4))
+    assert time.perf_counter() - t0 < 0.7
+    assert off._stats["failures"] == 1               # abgelaufenes Budget zählt für den Breaker
+
+
+def test_open_breaker_skips_request(monkeypatch):
+    calls = _stub_get(monkeypatch, lambda n: _Response())
+    for _ in range(5):
+        off.off_breaker.record_failure()
+    assert off.off_breaker.state == OPEN
+
+    with pytest.raises(off.NutritionPending):
+        off._search(PARAMS, Deadline(5.0))
+    pending: set[str] = set()
+    assert off.get_nutrition_bulk(["Apple"], Deadline(5.0), pending) == {"apple": None}
+    assert pending == {"apple"}
+    assert calls == []
+    assert "apple" not in off._CACHE                 # pending wird nicht gecacht
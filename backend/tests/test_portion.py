@@ -0,0 +1,93 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from portion import (CLAMP, DEFAULT_PRIOR, MASK_REL_FACTOR, PORTION_PRIORS, add_portions,
+                     estimate_portions, meal_totals)
+
+IMAGE = [1000, 1000]
+
+
+def _item(label, area_frac=None, nutrition=None, status=None, mask_area=None):
+    # quadratische Box mit dem gewünschten Flächenanteil am Bild
+    side = (area_frac or 0.0) ** 0.5 * IMAGE[0]
+    item = {"label": label, "confidence": 0.9, "bbox": [0, 0, side, side],
+            "nutrition_per_100g": nutrition}
+    if status is not None:
+        item["nutrition_status"] = status
+    if mask_area is not None:
+        item["mask_area"] = mask_area
+    return item
+
+
+def test_reference_area_gives_prior_grams():
+    ref_g, ref_area, rel = PORTION_PRIORS["apple"]
+    est, low, high = estimate_portions([_item("apple", ref_area)], IMAGE)[0]
+    assert est == pytest.approx(ref_g)
+    assert low == pytest.approx(ref_g * (1 - rel))
+    assert high == pytest.approx(ref_g * (1 + rel))
+
+
+def test_area_scales_with_volume_exponent():
+    ref_g, ref_area, _ = PORTION_PRIORS["apple"]
+    est = estimate_portions([_item("apple", ref_area * 1.21)], IMAGE)[0, 0]
+    assert est == pytest.approx(ref_g * 1.21 ** 1.5)
+
+
+def test_estimate_is_clamped():
+    ref_g, _, _ = PORTION_PRIORS["apple"]
+    grams = estimate_portions([_item("apple", 0.95), _item("apple", 0.0001)], IMAGE)
+    assert grams[0, 0] == pytest.approx(ref_g * CLAMP[1])
+    assert grams[1, 0] == pytest.approx(ref_g * CLAMP[0])
+
+
+def test_mask_area_replaces_box_and_narrows_bounds():
+    ref_g, ref_area, rel = PORTION_PRIORS["apple"]
+    # Box doppelt so groß wie die Maske -> Schätzung muss aus der Maske kommen
+    item = _item("apple", ref_area * 2, mask_area=ref_area * IMAGE[0] * IMAGE[1])
+    est, low, _ = estimate_portions([item], IMAGE)[0]
+    assert est == pytest.approx(ref_g)
+    assert low == pytest.approx(ref_g * (1 - rel * MASK_REL_FACTOR))
+
+
+def test_without_image_size_or_box_uses_prior():
+    ref_g = PORTION_PRIORS["banana"][0]
+    assert estimate_portions([_item("banana", 0.5)], None)[0, 0] == pytest.approx(ref_g)
+    assert estimate_portions([_item("banana", 0.0)], IMAGE)[0, 0] == pytest.approx(ref_g)
+    assert estimate_portions([_item("unknown thing")], None)[0, 0] == pytest.approx(DEFAULT_PRIOR[0])
+    assert estimate_portions([], IMAGE).shape == (0, 3)
+
+
+def test_totals_math():
+    grams = np.array([[200.0, 100.0, 300.0], [50.0, 40.0, 60.0]])
+    nutrition = [{"energy_kcal": 50, "fat_g": 1, "carbs_g": 10, "sugars_g": 5, "protein_g": 2},
+                 {"energy_kcal": 400, "fat_g": 20, "carbs_g": 40, "sugars_g": 30, "protein_g": 6}]
+    totals = meal_totals(grams, nutrition)
+    assert totals["grams"] == {"estimate": 250.0, "low": 140.0, "high": 360.0}
+    assert totals["energy_kcal"] == {"estimate": 300.0, "low": 210.0, "high": 390.0}
+    assert totals["protein_g"]["estimate"] == pytest.approx(7.0)
+    assert totals["missing"] == {key: 0 for key in totals["missing"]}
+    assert totals["items_without_nutrition"] == 0
+
+
+def test_missing_counted_per_nutrient():
+    grams = np.array([[100.0, 80.0, 120.0], [100.0, 80.0, 120.0], [100.0, 80.0, 120.0]])
+    nutrition = [{"energy_kcal": 100, "fat_g": 1, "carbs_g": 10, "sugars_g": None, "protein_g": 2},
+                 {"energy_kcal": 200},
+                 None]
+    totals = meal_totals(grams, nutrition)
+    assert totals["energy_kcal"]["estimate"] == pytest.approx(300.0)
+    assert totals["missing"] == {"energy_kcal": 1, "fat_g": 2, "carbs_g": 2, "sugars_g": 3, "protein_g": 2}
+    assert totals["items_without_nutrition"] == 1
+
+
+def test_loading_items_not_reported_as_missing():
+    items = [_item("apple", 0.06, nutrition={"energy_kcal": 52}, status="ok"),
+             _item("pear", 0.06, status="loading"),
+             _item("cake", 0.08, status="not_found")]
+    out, totals = add_portions(items, IMAGE)
+    assert [set(it["portion_g"]) for it in out] == [{"estimate", "low", "high"}] * 3
+    assert totals["items_loading"] == 1
+    assert totals["items_without_nutrition"] == 1
+    assert totals["missing"]["energy_kcal"] == 1
+    assert totals["missing"]["fat_g"] == 2
@@ -72,7 +72,7 @@ function App() {
       )}
 
       {/* Ausgabe der Erkennung */}
-      <ResultDisplay items={result?.items} />
+      <ResultDisplay items={result?.items} totals={result?.meal_totals} />
 
       {/* Feedback */}
       {result?.items?.length > 0 && <FeedbackForm onSubmit={handleFeedback} />}
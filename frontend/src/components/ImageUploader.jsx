@@ -1,5 +1,37 @@
 import React, { use, useState } from "react";
 
+// Ein Stream-Event (NDJSON-Zeile von /predict?stream=ndjson) in das Ergebnis einarbeiten
+const applyEvent = (current, event) => {
+  if (event.type === "detections") {
+    const rest = { ...event };
+    delete rest.type;
+    return rest; // Items mit nutrition_status "loading"
+  }
+  if (event.type === "nutrition") {
+    return {
+      ...current,
+      items: current.items.map((item) =>
+        (item.label || "").trim().toLowerCase() === event.label
+          ? {
+              ...item,
+              nutrition_per_100g: event.nutrition_per_100g,
+              nutrition_status: event.nutrition_status,
+            }
+          : item
+      ),
+    };
+  }
+  if (event.type === "done") {
+    return {
+      ...current,
+      done: true,
+      degraded: event.degraded,
+      meal_totals: event.meal_totals, // Summen mit allen geladenen Nährwerten
+    };
+  }
+  return current;
+};
+
 function ImageUploader({ onResult, setLoading }) {
   const [image, setImage] = useState(null); // Vorschau für Anzeige des hochgeladenen Bildes
   const [fileName, setFileName] = useState(""); // Dateinamen als eigenen State
@@ -18,15 +50,43 @@ function ImageUploader({ onResult, setLoading }) {
 
     setLoading(true); // Start Ladeanzeige
 
-    // POST an /predict-Endpunkt
-    const res = await fetch(`${import.meta.env.VITE_API_URL}/predict`, {
-      method: "POST",
-      body: formData,
-    });
+    // POST an /predict-Endpunkt (gestreamt: Detections sofort, Nährwerte folgen)
+    const res = await fetch(
+      `${import.meta.env.VITE_API_URL}/predict?stream=ndjson`,
+      {
+        method: "POST",
+        body: formData,
+      }
+    );
+
+    // Fehler (z. B. 429/503) oder Browser ohne Stream-Support: normales JSON
+    if (!res.ok || !res.body) {
+      const data = await res.json();
+      onResult(data); // Ergebnis (API-Objekt) an App zurückgeben
+      setLoading(false); // Ende Ladeanzeige
+      return;
+    }
 
-    const data = await res.json();
-    onResult(data); // Ergebnis (API-Objekt) an App zurückgeben
-    setLoading(false); // Ende Ladeanzeige
+    // NDJSON zeilenweise lesen und jedes Event sofort anzeigen
+    const reader = res.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = "";
+    let current = null;
+    while (true) {
+      const { value, done } = await reader.read();
+      if (done) break;
+      buffer += decoder.decode(value, { stream: true });
+      const lines = buffer.split("\n");
+      buffer = lines.pop(); // unvollständige letzte Zeile aufheben
+      for (const line of lines) {
+        if (!line.trim()) continue;
+        const event = JSON.parse(line);
+        current = applyEvent(current, event);
+        onResult(current);
+        if (event.type === "detections") setLoading(false); // Ergebnis steht, Nährwerte laden im Item nach
+      }
+    }
+    setLoading(false); // Ende Ladeanzeige (falls Stream ohne Events endet)
   };
 
   return (
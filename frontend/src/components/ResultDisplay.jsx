@@ -14,7 +14,27 @@ const pct = (p) =>
  *   product_name, energy_kj, energy_kcal, fat_g, carbs_g, sugars_g, protein_g, source
  * }
  */
-function NutritionBox({ data }) {
+function NutritionBox({ data, status }) {
+  // Nährwerte werden noch von OpenFoodFacts geladen (gestreamte Antwort)
+  if (status === "loading") {
+    return (
+      <div style={styles.card}>
+        <p style={styles.cardTitle}>Nährwerte pro 100 g</p>
+        <p style={styles.muted}>Nährwerte werden geladen…</p>
+      </div>
+    );
+  }
+
+  // OFF gerade nicht erreichbar (degradierter Modus im Backend)
+  if (!data && status === "pending") {
+    return (
+      <div style={styles.card}>
+        <p style={styles.cardTitle}>Nährwerte pro 100 g</p>
+        <p style={styles.muted}>Nährwertdienst derzeit nicht erreichbar.</p>
+      </div>
+    );
+  }
+
   // Wenn das Backend nichts gefunden hat (null), zeige einen knappen Hinweis
   if (!data) {
     return (
@@ -63,12 +83,56 @@ function NutritionBox({ data }) {
   );
 }
 
+/**
+ * Summen der Mahlzeit (geschätzte Portionen * Nährwerte pro 100 g)
+ * Erwartet den Backend-Key "meal_totals": { grams, energy_kcal, fat_g, ... }
+ * mit jeweils { estimate, low, high }, dazu "missing" (pro Nährwert: Anzahl
+ * Objekte ohne diesen Wert) und "items_loading" (Abfrage läuft noch)
+ */
+function MealTotals({ totals }) {
+  if (!totals) return null;
+  const range = (v, unit, key) => {
+    if (!v) return "–";
+    const missing = key ? totals.missing?.[key] ?? 0 : 0;
+    const text = `${fmt(v.estimate, unit)} (${v.low}–${v.high}${unit})`;
+    return missing > 0 ? `${text}, ohne ${missing} Objekt(e)` : text;
+  };
+
+  return (
+    <div style={styles.itemCard}>
+      <strong style={{ fontSize: 16 }}>Mahlzeit gesamt (geschätzt)</strong>
+      <ul style={styles.list}>
+        <li>Menge: {range(totals.grams, " g")}</li>
+        <li>Energie: {range(totals.energy_kcal, " kcal", "energy_kcal")}</li>
+        <li>Fett: {range(totals.fat_g, " g", "fat_g")}</li>
+        <li>
+          Kohlenhydrate (davon Zucker): {range(totals.carbs_g, " g", "carbs_g")}{" "}
+          ({range(totals.sugars_g, " g", "sugars_g")})
+        </li>
+        <li>Eiweiß: {range(totals.protein_g, " g", "protein_g")}</li>
+      </ul>
+      {totals.items_without_nutrition > 0 ? (
+        <p style={styles.source}>
+          {totals.items_without_nutrition} Objekt(e) ohne Nährwerte nicht
+          enthalten.
+        </p>
+      ) : null}
+      {totals.items_loading > 0 ? (
+        <p style={styles.source}>
+          Nährwerte für {totals.items_loading} Objekt(e) werden noch geladen.
+        </p>
+      ) : null}
+    </div>
+  );
+}
+
 /**
  * Hauptkomponente: listet erkannte Items (Label + Confidence + Nährwerte)
- * Erwartet von App.jsx: <ResultDisplay items={result?.items} />
- * Jedes item hat mind. { label, confidence } und optional { bbox, nutrition_per_100g }
+ * Erwartet von App.jsx: <ResultDisplay items={result?.items} totals={result?.meal_totals} />
+ * Jedes item hat mind. { label, confidence } und optional
+ * { bbox, nutrition_per_100g, nutrition_status, portion_g }
  */
-export default function ResultDisplay({ items }) {
+export default function ResultDisplay({ items, totals }) {
   if (!items || items.length === 0) return null;
 
   return (
@@ -84,13 +148,26 @@ export default function ResultDisplay({ items }) {
             <span style={styles.conf}>Sicherheit: {pct(item.confidence)}</span>
           </div>
 
+          {/* Geschätzte Portion aus Box-/Maskenfläche */}
+          {item.portion_g ? (
+            <p style={styles.refLine}>
+              Portion (geschätzt): ca. {item.portion_g.estimate} g (
+              {item.portion_g.low}–{item.portion_g.high} g)
+            </p>
+          ) : null}
+
           {/* Falls später Bounding Boxes angezeigt werden sollen: item.bbox als [x1,y1,x2,y2] */}
           {/* <pre>{JSON.stringify(item.bbox)}</pre> */}
 
           {/* Nährwerte-Box, füttern mit item.nutrition_per_100g (kann null sein) */}
-          <NutritionBox data={item.nutrition_per_100g} />
+          <NutritionBox
+            data={item.nutrition_per_100g}
+            status={item.nutrition_status}
+          />
         </div>
       ))}
+
+      <MealTotals totals={totals} />
     </div>
   );
 }